@@ -0,0 +1,77 @@
+"""
+Benchmark da validação de CPF: validate_cpf (um a um) x validate_cpf_batch.
+
+Uso:
+    python benchmarks/cpf_validation.py --count 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+
+def build_values(count, seed):
+    from core.validators import generate_cpf
+
+    rng = random.Random(seed)
+    pool = [generate_cpf(rng) for _ in range(min(count, 50_000))]
+    pool += ['111.111.111-11', '123.456.789-00', '123.456', '']
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def scalar(values):
+    from core.validators import validate_cpf
+    from rest_framework.serializers import ValidationError
+
+    valid = []
+    for value in values:
+        try:
+            validate_cpf(value)
+            valid.append(True)
+        except ValidationError:
+            valid.append(False)
+    return valid
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>16}: {elapsed:7.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    settings.configure()
+    django.setup()
+
+    from core.validators import HAS_NUMPY, validate_cpf_batch
+
+    values = build_values(args.count, args.seed)
+    print(f"{args.count} CPFs")
+
+    expected = timed('validate_cpf', scalar, values)
+    python_valid, _ = timed('batch (python)', validate_cpf_batch, values, False)
+    assert python_valid == expected
+
+    if not HAS_NUMPY:
+        print("NumPy não instalado; caminho vetorizado ignorado.")
+        return
+
+    numpy_valid, _ = timed('batch (numpy)', validate_cpf_batch, values)
+    assert numpy_valid == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark do DirectMXEmailBackend contra um servidor SMTP falso local.
+
+Cada comando SMTP responde com uma latência artificial, simulando servidores
+MX remotos. Compara a entrega sequencial (max_workers=1) com a concorrente.
+Com --fanout > 1 cada mensagem tem vários destinatários, o que mostra o ganho
+de enviar uma única transação (vários RCPT TO) por mensagem e domínio.
+
+Uso:
+    python benchmarks/email_delivery.py --recipients 500 --domains 80 --latency 0.02
+    python benchmarks/email_delivery.py --recipients 500 --domains 10 --fanout 50
+"""
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost ESMTP fake')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command.startswith('DATA'):
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                self.server.transactions += 1
+                self.reply('250 OK')
+            elif command.startswith('RCPT'):
+                self.server.recipients += 1
+                self.reply('250 OK')
+            elif command.startswith('QUIT'):
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), FakeSMTPHandler)
+        self.latency = latency
+        self.transactions = 0
+        self.recipients = 0
+
+
+def build_messages(recipients, domains, fanout):
+    from django.core.mail import EmailMessage
+
+    return [
+        EmailMessage(
+            subject='Notificação',
+            body='Sua ordem de serviço foi atualizada.',
+            from_email='nao-responda@sigos.com.br',
+            to=[f'user{i}@dominio{i % domains}.com.br' for i in range(start, min(start + fanout, recipients))],
+        )
+        for start in range(0, recipients, fanout)
+    ]
+
+
+def run(backend_class, messages, **kwargs):
+    backend = backend_class(**kwargs)
+    start = time.perf_counter()
+    sent = backend.send_messages(messages)
+    return sent, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--recipients', type=int, default=500)
+    parser.add_argument('--domains', type=int, default=80)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=20)
+    parser.add_argument('--per-domain', type=int, default=1)
+    parser.add_argument('--fanout', type=int, default=1, help='destinatários por mensagem')
+    args = parser.parse_args()
+
+    server = FakeSMTPServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    settings.configure(EMAIL_DIRECT_MX_PORT=server.server_address[1])
+    django.setup()
+
+    from core.email_backends import DirectMXEmailBackend
+
+    class LocalMXBackend(DirectMXEmailBackend):
+        def _resolve_mx(self, domain):
+            return '127.0.0.1'
+
+    messages = build_messages(args.recipients, args.domains, args.fanout)
+
+    print(f"{args.recipients} destinatários, {args.domains} domínios, latência {args.latency * 1000:.0f} ms/comando")
+    for label, kwargs in (
+        ('sequencial', {'max_workers': 1}),
+        ('concorrente', {'max_workers': args.workers, 'max_per_domain': args.per_domain}),
+    ):
+        server.transactions = server.recipients = 0
+        sent, elapsed = run(LocalMXBackend, messages, **kwargs)
+        print(
+            f"{label:>12}: {elapsed:7.2f}s  enviados={sent}  "
+            f"transações={server.transactions}  rcpt={server.recipients}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Teste de carga simples: WSGI (gunicorn) x ASGI (uvicorn com ASYNC_VIEWS=True).
+
+Sobe os dois servidores com o mesmo número de workers, dispara a mesma carga
+(requisições concorrentes com keep-alive) e imprime vazão e latências.
+
+Uso:
+    # compara os dois modos no endpoint informado
+    python benchmarks/load_test.py compare --path /api/v1/hello/ --concurrency 50 --requests 5000
+
+    # endpoints autenticados: gere um token com /api/v1/auth/login/
+    python benchmarks/load_test.py compare --path /api/v1/ordens-servico/ --token <access>
+
+    # só dispara carga contra um servidor já em execução
+    python benchmarks/load_test.py run --url http://127.0.0.1:8000/api/v1/hello/
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker(url, headers, count, latencies, errors):
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        latencies.append(time.perf_counter() - start)
+
+    conn.close()
+
+
+def run_load(url, concurrency, requests, token=None):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    latencies, errors = [], []
+    per_thread = max(1, requests // concurrency)
+
+    threads = [
+        threading.Thread(target=worker, args=(url, headers, per_thread, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+    }
+
+
+def print_result(label, result):
+    print(
+        f"{label:>8}: {result['rps']:8.1f} req/s  p50={result['p50_ms']:7.1f}ms  "
+        f"p95={result['p95_ms']:7.1f}ms  p99={result['p99_ms']:7.1f}ms  "
+        f"erros={result['errors']}/{result['requests']}"
+    )
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/v1/hello/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Servidor na porta {port} não respondeu em {timeout}s.')
+
+
+def start_server(mode, port, workers):
+    env = dict(os.environ)
+    if mode == 'wsgi':
+        command = [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ]
+    else:
+        env['ASYNC_VIEWS'] = 'True'
+        command = [
+            sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+            '--workers', str(workers), '--port', str(port), '--log-level', 'warning',
+        ]
+    return subprocess.Popen(command, cwd=ROOT, env=env)
+
+
+def compare(args):
+    for mode, port in (('wsgi', args.port), ('asgi', args.port + 1)):
+        process = start_server(mode, port, args.workers)
+        try:
+            wait_until_ready(port)
+            url = f'http://127.0.0.1:{port}{args.path}'
+            run_load(url, args.concurrency, min(args.requests, 200), args.token)
+            print_result(mode, run_load(url, args.concurrency, args.requests, args.token))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('--url', required=True)
+
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('--path', default='/api/v1/hello/')
+    compare_parser.add_argument('--workers', type=int, default=4)
+    compare_parser.add_argument('--port', type=int, default=8100)
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--concurrency', type=int, default=50)
+        sub.add_argument('--requests', type=int, default=5000)
+        sub.add_argument('--token')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        print_result('run', run_load(args.url, args.concurrency, args.requests, args.token))
+    else:
+        print(f"{args.path}: {args.workers} workers, concorrência {args.concurrency}")
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
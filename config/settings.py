@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
-from decouple import config
+import tempfile
+from decouple import Csv, config
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -58,6 +59,29 @@ PASSWORD_HASHERS = [
 
 DJANGO_SALT = config('DJANGO_SALT', default='salt-fixo-para-testes-ABCD123456')
 
+# Chave do HMAC usado em ServiceOrder.cpf_key. Trocar a chave exige rodar
+# `python manage.py backfill_cpf_key --all`.
+CPF_HASH_KEY = config('CPF_HASH_KEY', default=DJANGO_SALT)
+
+# Com ASGI (uvicorn config.asgi:application), ative para servir os GETs de
+# ordens de serviço, perfil e hello/ com views assíncronas (core/async_views.py).
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Deploy serverless (Vercel, config/wsgi.py): cada instância atende poucas
+# requisições, então métricas por processo não servem e a edge já comprime.
+# A instância já sobe com o URLconf importado e as rotas de WARMUP_PATHS resolvidas.
+SERVERLESS = config('SERVERLESS', default=False, cast=bool)
+# Rotas resolvidas no aquecimento (core.warmup e SERVERLESS).
+WARMUP_PATHS = config('WARMUP_PATHS', default='/api/v1/hello/,/api/v1/ordens-servico/', cast=Csv())
+
+# Reuso de conexões com o PostgreSQL:
+# - WSGI (gunicorn): conexões persistentes por worker com CONN_MAX_AGE e
+#   health check antes de reutilizar.
+# - ASGI: cada requisição pode rodar em uma thread diferente, então conexões
+#   persistentes vazam; use DB_POOL=True (pool do psycopg 3, exige
+#   `pip install "psycopg[binary,pool]"`).
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -66,7 +90,53 @@ DATABASES = {
         'PASSWORD': config('DB_PASS', default='postgres'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0 if ASYNC_VIEWS or DB_POOL else 60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    }
+}
+
+if DB_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'max_idle': config('DB_POOL_MAX_IDLE', default=600, cast=float),
+        },
+    }
+
+# Réplicas de leitura: lista de `host` ou `host:porta` com as mesmas credenciais
+# do primário. Sem réplicas configuradas o roteador e o middleware ficam desligados.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    host, _, port = replica.partition(':')
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter'] if DATABASE_REPLICAS else []
+
+# Depois de escrever, o usuário lê do primário por esse tempo (atraso de replicação).
+DATABASE_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+# Intervalo entre verificações de saúde de cada réplica, por processo.
+DATABASE_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=5, cast=int)
+
+# `shared` é um cache em arquivo visível por todos os workers do mesmo host,
+# usado onde o estado precisa valer entre processos (sem depender de Redis).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('SHARED_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'sigos-cache')),
+    },
 }
 
 REST_FRAMEWORK = {
@@ -80,9 +150,38 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Baldes de fichas dos endpoints caros (core.throttling): rajada de N, repõe N por período.
+    'DEFAULT_THROTTLE_RATES': {
+        'login': config('RATE_LIMIT_LOGIN', default='10/min'),
+        'password_reset': config('RATE_LIMIT_PASSWORD_RESET', default='5/hour'),
+        'import': config('RATE_LIMIT_IMPORT', default='20/hour'),
+        'search': config('RATE_LIMIT_SEARCH', default='60/min'),
+    },
+    # Proxies à frente da aplicação (fly.io, Vercel): o IP do cliente vem do X-Forwarded-For.
+    'NUM_PROXIES': config('NUM_PROXIES', default=1, cast=int),
+}
+
+# Limites de uso (core.throttling). RATE_LIMITING=False desliga baldes e vagas.
+RATE_LIMITING = config('RATE_LIMITING', default=True, cast=bool)
+RATE_LIMIT_CACHE = 'shared'
+RATE_LIMIT_STAFF_MULTIPLIER = config('RATE_LIMIT_STAFF_MULTIPLIER', default=5, cast=int)
+RATE_LIMIT_EXEMPT_USERS = config('RATE_LIMIT_EXEMPT_USERS', default='', cast=Csv())
+# Requisições simultâneas por escopo na máquina; acima disso a API responde 503.
+CONCURRENCY_LIMITS = {
+    'login': config('CONCURRENCY_LIMIT_LOGIN', default=8, cast=int),
+    'import': config('CONCURRENCY_LIMIT_IMPORT', default=2, cast=int),
+    'search': config('CONCURRENCY_LIMIT_SEARCH', default=8, cast=int),
 }
+CONCURRENCY_LOCK_DIR = config('CONCURRENCY_LOCK_DIR', default=os.path.join(tempfile.gettempdir(), 'sigos-slots'))
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryInspectorMiddleware',
+    'core.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -92,8 +191,44 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.replica_pinning_middleware',
 ]
 
+if ASYNC_VIEWS:
+    # O WhiteNoiseMiddleware só é síncrono e forçaria toda requisição ASGI a
+    # passar por uma thread; no modo ASGI os estáticos são servidos em config/asgi.py.
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Compressão das respostas (CompressionMiddleware); desligue se o proxy já comprime.
+COMPRESSION = config('COMPRESSION', default=not SERVERLESS, cast=bool)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_LEVEL = config('COMPRESSION_LEVEL', default=6, cast=int)
+
+# Fração das requisições medidas pelo MetricsMiddleware (0 desliga o middleware).
+METRICS_SAMPLE_RATE = config('METRICS_SAMPLE_RATE', default=0.0 if SERVERLESS else 1.0, cast=float)
+# Se definido, GET /metrics exige `Authorization: Bearer <METRICS_TOKEN>`.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Detector de N+1 e consultas lentas (desenvolvimento e testes).
+QUERY_INSPECTOR = config('QUERY_INSPECTOR', default=False, cast=bool)
+QUERY_INSPECTOR_RAISE = config('QUERY_INSPECTOR_RAISE', default=False, cast=bool)
+QUERY_INSPECTOR_REPEAT_THRESHOLD = config('QUERY_INSPECTOR_REPEAT_THRESHOLD', default=5, cast=int)
+QUERY_INSPECTOR_SLOW_MS = config('QUERY_INSPECTOR_SLOW_MS', default=100, cast=int)
+
+# Snapshots Parquet das ordens de serviço (comando export_snapshot).
+ANALYTICS_SNAPSHOT_DIR = config('ANALYTICS_SNAPSHOT_DIR', default=os.path.join(BASE_DIR, 'snapshots'))
+
+# Stream SSE de /ordens-servico/eventos/ (modo ASGI).
+ORDER_EVENTS_HEARTBEAT = config('ORDER_EVENTS_HEARTBEAT', default=15, cast=int)
+# Intervalo de consulta à tabela de eventos quando o banco não tem LISTEN/NOTIFY.
+ORDER_EVENTS_POLL_INTERVAL = config('ORDER_EVENTS_POLL_INTERVAL', default=2, cast=float)
+
+# Intervalo (s) entre varreduras do comando scan_sla.
+SLA_SCAN_INTERVAL = config('SLA_SCAN_INTERVAL', default=60, cast=int)
+
+# Horas em que uma Idempotency-Key (ou o hash de um CSV importado) repete a resposta guardada.
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24, cast=int)
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -163,6 +298,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 EMAIL_BACKEND = 'core.email_backends.DirectMXEmailBackend'
 
+EMAIL_DIRECT_MX_MAX_WORKERS = config('EMAIL_DIRECT_MX_MAX_WORKERS', default=10, cast=int)
+EMAIL_DIRECT_MX_MAX_PER_DOMAIN = config('EMAIL_DIRECT_MX_MAX_PER_DOMAIN', default=1, cast=int)
+EMAIL_DIRECT_MX_MAX_RECIPIENTS = config('EMAIL_DIRECT_MX_MAX_RECIPIENTS', default=100, cast=int)
+
 DEFAULT_FROM_EMAIL = 'nao-responda@sigos.com.br'
 
 PASSWORD_RESET_TIMEOUT = 3600 * 4  # 4 horas
@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+if settings.SERVERLESS:
+    # Na carga da instância, e não durante a primeira requisição. O aquecimento
+    # completo (banco, JWT) fica para o gunicorn: aqui a instância pode nem
+    # chegar a usar o banco.
+    from core.warmup import preload_urls
+
+    preload_urls()
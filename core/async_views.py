@@ -0,0 +1,242 @@
+"""
+Versões assíncronas dos endpoints de leitura mais acessados.
+
+Usadas no lugar das views síncronas quando ASYNC_VIEWS=True (deploy ASGI com
+uvicorn). O GET roda nativamente com o ORM assíncrono do Django; os demais
+métodos são repassados à view DRF síncrona correspondente.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import views
+from .events import stream_events
+from .models import ServiceOrder, ServiceOrderEvent
+from .renderers import FastJSONRenderer, MessagePackRenderer
+from .serializers import ServiceOrderSerializer, UserProfileSerializer
+from .throttling import acquire_slot, release_slot
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token)
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+
+        user = await self.user_model.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None:
+            raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise exceptions.AuthenticationFailed("The user's password has been changed.", code='password_changed')
+
+        return user
+
+
+class QueryParamJWTAuthentication(AsyncJWTAuthentication):
+    """
+    Aceita também `?access_token=`: o EventSource do navegador não envia headers.
+    """
+
+    def get_header(self, request):
+        header = super().get_header(request)
+        token = request.GET.get('access_token')
+        if header is None and token:
+            header = f'Bearer {token}'.encode()
+        return header
+
+
+def error_response(exc):
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+
+    response = JsonResponse(data, status=exc.status_code, safe=False)
+    if exc.status_code == 401:
+        response['WWW-Authenticate'] = 'Bearer realm="api"'
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = f'{math.ceil(exc.wait)}'
+    return response
+
+
+class AsyncReadView(View):
+    """
+    GET assíncrono autenticado por JWT; os outros métodos vão para `sync_view_class`.
+    """
+    sync_view_class = None
+    authentication_class = AsyncJWTAuthentication
+    authentication_required = True
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authentication_class().aauthenticate(request)
+            if request.user is None and self.authentication_required:
+                raise exceptions.NotAuthenticated()
+            return await self.aget(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return error_response(exc)
+
+    async def aget(self, request, *args, **kwargs):
+        # As subclasses implementam; sem isso o GET não é suportado.
+        return await self.http_method_not_allowed(request, *args, **kwargs)
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view_class.as_view())(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.delegate(request, *args, **kwargs)
+
+    async def put(self, request, *args, **kwargs):
+        return await self.delegate(request, *args, **kwargs)
+
+    async def patch(self, request, *args, **kwargs):
+        return await self.delegate(request, *args, **kwargs)
+
+    async def delete(self, request, *args, **kwargs):
+        return await self.delegate(request, *args, **kwargs)
+
+    async def options(self, request, *args, **kwargs):
+        return await self.delegate(request, *args, **kwargs)
+
+
+def json_response(data):
+    # Mesmo renderer das views DRF: datas e UUIDs saem no mesmo formato nos dois modos.
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json')
+
+
+def negotiated_response(view, request, data):
+    """JSON, ou MessagePack quando o cliente pede (Accept ou `?format=msgpack`)."""
+    renderer, media_type = view.perform_content_negotiation(request, force=True)
+    if isinstance(renderer, MessagePackRenderer):
+        return HttpResponse(renderer.render(data, media_type), content_type=media_type)
+    return json_response(data)
+
+
+async def apaginate(pagination, queryset, request):
+    page_size = pagination.get_page_size(request)
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    paginator.count = await queryset.acount()
+
+    page_number = pagination.get_page_number(request, paginator)
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise exceptions.NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+    page.object_list = [obj async for obj in page.object_list]
+    pagination.page = page
+    pagination.request = request
+    return page.object_list
+
+
+class OrdemServicoList(AsyncReadView):
+    sync_view_class = views.OrdemServicoList
+
+    async def aget(self, request, *args, **kwargs):
+        # Reaproveita filtros, busca e ordenação da view DRF; nenhum deles acessa o banco.
+        drf_request = Request(request)
+        drf_request.user = request.user
+        view = self.sync_view_class(request=drf_request, args=args, kwargs=kwargs, format_kwarg=None)
+        # Mesmos limites da view síncrona; o balde fica no cache em disco.
+        await sync_to_async(view.check_throttles)(drf_request)
+        slot = acquire_slot(view.get_concurrency_scope(drf_request))
+        try:
+            queryset = view.filter_queryset(view.get_queryset())
+            pagination = view.paginator
+            page = await apaginate(pagination, queryset, drf_request)
+
+            serializer = ServiceOrderSerializer(page, many=True, context={'request': drf_request})
+            data = pagination.get_paginated_response(serializer.data).data
+        finally:
+            release_slot(slot)
+        return negotiated_response(view, drf_request, data)
+
+
+class OrdemServicoDetail(AsyncReadView):
+    sync_view_class = views.OrdemServicoDetail
+
+    async def aget(self, request, pk, *args, **kwargs):
+        order = await ServiceOrder.objects.select_related('created_by').filter(pk=pk).afirst()
+        if order is None:
+            raise exceptions.NotFound()
+
+        drf_request = Request(request)
+        view = self.sync_view_class(request=drf_request, args=args, kwargs={'pk': pk, **kwargs}, format_kwarg=None)
+        return negotiated_response(view, drf_request, ServiceOrderSerializer(order, context={'request': request}).data)
+
+
+class OrdemServicoEventos(AsyncReadView):
+    """
+    Stream SSE das alterações nas ordens visíveis ao usuário (administradores
+    recebem todas). Retoma a partir do header `Last-Event-ID`.
+    """
+    http_method_names = ['get']
+    authentication_class = QueryParamJWTAuthentication
+
+    async def aget(self, request, *args, **kwargs):
+        # Sempre no primário: o NOTIFY pode chegar antes de a réplica ter o evento.
+        events = ServiceOrderEvent.objects.using('default')
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        if last_event_id:
+            try:
+                last_id = int(last_event_id)
+            except ValueError:
+                raise exceptions.ValidationError({'last_event_id': 'Deve ser o id numérico de um evento.'})
+        else:
+            # Sem ponto de retomada, o cliente só recebe o que acontecer daqui em diante.
+            last_id = await events.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+        if not request.user.is_staff:
+            events = events.filter(created_by=request.user)
+
+        response = StreamingHttpResponse(stream_events(events, last_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Desliga o buffer do nginx para os eventos saírem na hora.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class UserProfileView(AsyncReadView):
+    sync_view_class = views.UserProfileView
+
+    async def aget(self, request, *args, **kwargs):
+        return json_response(UserProfileSerializer(request.user, context={'request': request}).data)
+
+
+@require_GET
+async def hello_world(request):
+    return JsonResponse({"message": "hello"})
@@ -0,0 +1,75 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+_replica_health = {}
+
+# Apps cujas leituras precisam ver a própria escrita imediatamente
+# (ex.: a sessão criada no login é lida na requisição seguinte).
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+def pin_to_primary(pinned=True):
+    return _pinned_to_primary.set(pinned)
+
+
+def unpin(token):
+    _pinned_to_primary.reset(token)
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+def _probe(alias):
+    connection = connections[alias]
+    try:
+        if connection.connection is None or not connection.is_usable():
+            connection.close()
+            connection.ensure_connection()
+        return True
+    except DatabaseError:
+        connection.close()
+        return False
+
+
+def replica_is_healthy(alias):
+    healthy, checked_at = _replica_health.get(alias, (True, float('-inf')))
+    now = time.monotonic()
+    if now - checked_at < settings.DATABASE_REPLICA_CHECK_INTERVAL:
+        return healthy
+
+    healthy = _probe(alias)
+    _replica_health[alias] = (healthy, now)
+    return healthy
+
+
+class ReplicaRouter:
+    """
+    Leituras vão para uma réplica saudável de DATABASE_REPLICAS; escritas, e
+    qualquer leitura feita depois de uma escrita no mesmo contexto, vão para o
+    primário. Sem réplicas disponíveis, tudo cai no primário.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_pinned_to_primary() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if replica_is_healthy(alias)]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
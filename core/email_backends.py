@@ -1,56 +1,114 @@
 import smtplib
-import dns.resolver
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from django.core.mail.backends.base import BaseEmailBackend
 from django.conf import settings
 
+
+def dns_errors():
+    # dnspython é importado só no envio (ver _resolve_mx), então as exceções
+    # dele também: o nome `dns` não existe no escopo do módulo.
+    import dns.resolver
+
+    return (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN)
+
+
 class DirectMXEmailBackend(BaseEmailBackend):
-    def __init__(self, fail_silently=False, **kwargs):
+    def __init__(self, fail_silently=False, max_workers=None, max_per_domain=None, **kwargs):
         super().__init__(fail_silently=fail_silently)
+        self.port = getattr(settings, 'EMAIL_DIRECT_MX_PORT', 25)
+        self.timeout = getattr(settings, 'EMAIL_DIRECT_MX_TIMEOUT', 10)
+        # Limite global de conexões SMTP simultâneas e limite por domínio.
+        self.max_workers = max_workers or getattr(settings, 'EMAIL_DIRECT_MX_MAX_WORKERS', 10)
+        self.max_per_domain = max_per_domain or getattr(settings, 'EMAIL_DIRECT_MX_MAX_PER_DOMAIN', 1)
+        self.max_recipients = getattr(settings, 'EMAIL_DIRECT_MX_MAX_RECIPIENTS', 100)
 
     def send_messages(self, email_messages):
         if not email_messages:
             return 0
 
-        messages_by_domain = defaultdict(list)
+        # Agrupa os destinatários por domínio e por mensagem: cada mensagem é
+        # serializada uma única vez e enviada com vários RCPT TO por transação.
+        messages_by_domain = defaultdict(dict)
+        rendered = {}
         for message in email_messages:
-            
-            for recipient in message.recipients():
+            recipients = message.recipients()
+            if not recipients:
+                continue
+            rendered[id(message)] = message.message().as_bytes()
+
+            for recipient in recipients:
                 domain = recipient.split('@')[-1]
-                messages_by_domain[domain].append((message, recipient))
+                messages_by_domain[domain].setdefault(message, []).append(recipient)
+
+        batches = []
+        for domain, by_message in messages_by_domain.items():
+            transactions = [
+                (message, rendered[id(message)], recipients[i:i + self.max_recipients])
+                for message, recipients in by_message.items()
+                for i in range(0, len(recipients), self.max_recipients)
+            ]
+            connections = min(self.max_per_domain, len(transactions))
+            for i in range(connections):
+                batches.append((domain, transactions[i::connections]))
+
+        if not batches:
+            return 0
+
+        if self.max_workers <= 1 or len(batches) == 1:
+            return sum(self._deliver(domain, transactions) for domain, transactions in batches)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            futures = [executor.submit(self._deliver, domain, transactions) for domain, transactions in batches]
+            return sum(future.result() for future in futures)
 
+    def _resolve_mx(self, domain):
+        # Importado só no envio: o dnspython pesa na partida da aplicação (deploy serverless).
+        import dns.resolver
+
+        mx_records = dns.resolver.resolve(domain, 'MX')
+        mx_records = sorted(mx_records, key=lambda r: r.preference)
+        return str(mx_records[0].exchange)
+
+    def _deliver(self, domain, transactions):
         sent_count = 0
-        
-        for domain, messages in messages_by_domain.items():
-            try:
-                mx_records = dns.resolver.resolve(domain, 'MX')
-                mx_records = sorted(mx_records, key=lambda r: r.preference)
-                mx_host = str(mx_records[0].exchange)
-
-                with smtplib.SMTP(mx_host, 25, timeout=10) as server:
-                    
+
+        try:
+            mx_host = self._resolve_mx(domain)
+
+            with smtplib.SMTP(mx_host, self.port, timeout=self.timeout) as server:
+
+                server.ehlo()
+                if server.has_extn('starttls'):
+                    server.starttls()
                     server.ehlo()
-                    if server.has_extn('starttls'):
-                        server.starttls()
-                        server.ehlo()
-                    
-                    for message, recipient in messages:
-                        try:
-                            msg_bytes = message.message().as_bytes()
-                            server.sendmail(
-                                message.from_email, 
-                                [recipient], 
-                                msg_bytes
-                            )
-                            sent_count += 1
-                        except smtplib.SMTPException as e:
-                            if not self.fail_silently:
-                                raise
-                            print(f"Falha ao enviar e-mail para {recipient}: {e}")
-                            
-            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, smtplib.SMTPException) as e:
-                if not self.fail_silently:
-                    raise
-                print(f"Falha ao conectar ao servidor para o domínio {domain}: {e}")
-        
-        return sent_count
\ No newline at end of file
+
+                for message, msg_bytes, recipients in transactions:
+                    try:
+                        refused = server.sendmail(
+                            message.from_email,
+                            recipients,
+                            msg_bytes
+                        )
+                    except smtplib.SMTPRecipientsRefused as e:
+                        refused = e.recipients
+                    except smtplib.SMTPException as e:
+                        if not self.fail_silently:
+                            raise
+                        print(f"Falha ao enviar e-mail para {', '.join(recipients)}: {e}")
+                        continue
+
+                    sent_count += len(recipients) - len(refused)
+                    if refused:
+                        if not self.fail_silently:
+                            raise smtplib.SMTPRecipientsRefused(refused)
+                        for recipient, error in refused.items():
+                            print(f"Falha ao enviar e-mail para {recipient}: {error}")
+
+        # OSError cobre SMTPException e falhas de conexão (recusada, timeout).
+        except (OSError, *dns_errors()) as e:
+            if not self.fail_silently:
+                raise
+            print(f"Falha ao conectar ao servidor para o domínio {domain}: {e}")
+
+        return sent_count
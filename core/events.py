@@ -0,0 +1,255 @@
+"""
+Eventos de criação, alteração e remoção de ordens de serviço, transmitidos por
+Server-Sent Events em /api/v1/ordens-servico/eventos/.
+
+Cada alteração grava um ServiceOrderEvent na mesma transação da ordem. No
+PostgreSQL a transação também emite `NOTIFY`, entregue só depois do commit: os
+streams abertos (um `LISTEN` por processo) acordam e leem os eventos novos da
+tabela. Nos demais bancos os streams consultam a tabela periodicamente.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ServiceOrder, ServiceOrderEvent, ServiceOrderEventAction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'service_order_events'
+RECONNECT_DELAY = 5
+RETRY_MS = 3000
+
+# Campos da ordem enviados no evento; o cliente busca o restante no detalhe se precisar.
+EVENT_FIELDS = ['id', 'protocol', 'so_number', 'type', 'status', 'provider', 'priority', 'created_by_id', 'updated_at']
+
+_batch = ContextVar('service_order_event_batch', default=None)
+
+
+def build_event(action, values):
+    payload = {field: values[field] for field in EVENT_FIELDS if field != 'created_by_id'}
+    return ServiceOrderEvent(
+        order_id=values['id'],
+        action=action,
+        created_by_id=values['created_by_id'],
+        payload=payload,
+    )
+
+
+def notify(using='default'):
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        # Dentro de uma transação, notificações iguais viram uma só.
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, ''])
+
+
+def record_events(action, rows, using='default'):
+    """
+    Grava um evento para cada ordem de `rows` (dicionários com EVENT_FIELDS).
+    """
+    events = [build_event(action, values) for values in rows]
+    pending = _batch.get()
+    if pending is not None:
+        pending.extend(events)
+    elif events:
+        ServiceOrderEvent.objects.using(using).bulk_create(events)
+        notify(using)
+
+
+@contextmanager
+def batched_events(using='default'):
+    """
+    Junta os eventos gerados no bloco (ex.: importação CSV) em um único INSERT
+    e um único NOTIFY. Use dentro da mesma transação das alterações.
+    """
+    pending = []
+    token = _batch.set(pending)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    if pending:
+        ServiceOrderEvent.objects.using(using).bulk_create(pending)
+        notify(using)
+
+
+def _instance_values(instance):
+    return {field: getattr(instance, field) for field in EVENT_FIELDS}
+
+
+@receiver(post_save, sender=ServiceOrder, dispatch_uid='service_order_event_save')
+def _order_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    action = ServiceOrderEventAction.CREATED if created else ServiceOrderEventAction.UPDATED
+    record_events(action, [_instance_values(instance)], using)
+
+
+@receiver(post_delete, sender=ServiceOrder, dispatch_uid='service_order_event_delete')
+def _order_deleted(sender, instance, using='default', **kwargs):
+    record_events(ServiceOrderEventAction.DELETED, [_instance_values(instance)], using)
+
+
+class EventListener:
+    """
+    Conexão `LISTEN` compartilhada pelos streams de um event loop. Fica aberta
+    enquanto houver streams inscritos.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self._subscribers = set()
+        self._task = None
+
+    @asynccontextmanager
+    async def subscribe(self):
+        wakeup = asyncio.Event()
+        self._subscribers.add(wakeup)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            yield wakeup
+        finally:
+            self._subscribers.discard(wakeup)
+            if not self._subscribers and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    def _wake(self):
+        for wakeup in self._subscribers:
+            wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('LISTEN %s interrompido; reconectando em %ss.', CHANNEL, RECONNECT_DELAY)
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _connect_params(self):
+        params = connections[self.using].get_connection_params()
+        # Específicos dos cursores síncronos do Django.
+        params.pop('cursor_factory', None)
+        params.pop('context', None)
+        return params
+
+    async def _listen(self):
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        if is_psycopg3:
+            import psycopg
+
+            connection = await psycopg.AsyncConnection.connect(**self._connect_params(), autocommit=True)
+            async with connection:
+                await connection.execute(f'LISTEN {CHANNEL}')
+                # Eventos gravados antes do LISTEN não geraram aviso para este processo.
+                self._wake()
+                async for _ in connection.notifies():
+                    self._wake()
+        else:
+            import psycopg2
+
+            connection = await sync_to_async(psycopg2.connect, thread_sensitive=False)(**self._connect_params())
+            connection.autocommit = True
+            loop = asyncio.get_running_loop()
+            readable = asyncio.Event()
+            loop.add_reader(connection.fileno(), readable.set)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                self._wake()
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    connection.poll()
+                    if connection.notifies:
+                        connection.notifies.clear()
+                        self._wake()
+            finally:
+                loop.remove_reader(connection.fileno())
+                connection.close()
+
+
+class PollingListener:
+    """Sem LISTEN/NOTIFY: os streams só acordam pelo timeout (consulta periódica)."""
+
+    @asynccontextmanager
+    async def subscribe(self):
+        yield asyncio.Event()
+
+
+_listeners = weakref.WeakKeyDictionary()
+
+
+def get_listener(using='default'):
+    if connections[using].vendor != 'postgresql':
+        return PollingListener()
+
+    loop = asyncio.get_running_loop()
+    if loop not in _listeners:
+        _listeners[loop] = EventListener(using)
+    return _listeners[loop]
+
+
+def _fetch(events, last_id, limit):
+    found = list(events.filter(id__gt=last_id)[:limit])
+    connection = connections[events.db]
+    # Um stream fica aberto por muito tempo: não segura a conexão entre as consultas
+    # (respeita CONN_MAX_AGE; com o pool do psycopg 3 ela volta ao pool).
+    if not connection.in_atomic_block:
+        connection.close_if_unusable_or_obsolete()
+    return found
+
+
+def format_event(event):
+    data = json.dumps(event.payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'id: {event.pk}\nevent: {event.action}\ndata: {data}\n\n'
+
+
+async def stream_events(events, last_id, batch_size=500):
+    """
+    Texto `text/event-stream` com os eventos de `events` de id maior que
+    `last_id`, seguido dos eventos novos conforme são gravados. Quando não há
+    eventos, envia um comentário a cada ORDER_EVENTS_HEARTBEAT segundos para
+    manter a conexão viva em proxies.
+    """
+    listener = get_listener(events.db)
+    heartbeat = settings.ORDER_EVENTS_HEARTBEAT
+    timeout = heartbeat if isinstance(listener, EventListener) else settings.ORDER_EVENTS_POLL_INTERVAL
+
+    yield f'retry: {RETRY_MS}\n\n'
+    async with listener.subscribe() as wakeup:
+        idle_since = time.monotonic()
+        while True:
+            wakeup.clear()
+            found = await sync_to_async(_fetch)(events, last_id, batch_size)
+            for event in found:
+                yield format_event(event)
+                last_id = event.pk
+
+            if found:
+                idle_since = time.monotonic()
+                if len(found) == batch_size:
+                    continue
+            elif time.monotonic() - idle_since >= heartbeat:
+                yield ': keep-alive\n\n'
+                idle_since = time.monotonic()
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
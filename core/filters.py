@@ -0,0 +1,72 @@
+import django_filters
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .models import ServiceOrder
+
+
+class PrefixSearchFilter(BaseFilterBackend):
+    """
+    Busca por prefixo (`LIKE 'termo%'`) nos campos de `prefix_search_fields`.
+
+    No PostgreSQL, campos CharField únicos ou com db_index ganham um índice
+    `varchar_pattern_ops`, então a busca é resolvida pelo índice.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        fields = getattr(view, 'prefix_search_fields', None)
+        if not term or not fields:
+            return queryset
+
+        query = Q()
+        for field in fields:
+            query |= Q(**{f'{field}__startswith': term})
+        return queryset.filter(query)
+
+
+class ServiceOrderFilter(django_filters.FilterSet):
+    """
+    Filtros da listagem de ordens de serviço.
+
+    Cada combinação tem um índice correspondente em ServiceOrder.Meta.indexes:
+    intervalos de created_at/updated_at e status/priority (únicos ou múltiplos,
+    `?status__in=open,in_progress`) junto com o intervalo de created_at.
+    """
+    cpf = django_filters.CharFilter(method='filter_cpf')
+
+    class Meta:
+        model = ServiceOrder
+        fields = {
+            'status': ['exact', 'in'],
+            'priority': ['exact', 'in'],
+            'type': ['exact'],
+            'provider': ['exact'],
+            'created_at': ['gte', 'gt', 'lte', 'lt'],
+            'updated_at': ['gte', 'gt', 'lte', 'lt'],
+        }
+
+    def filter_cpf(self, queryset, name, value):
+        return queryset.for_cpf(value)
+
+
+class ServiceOrderOrderingFilter(OrderingFilter):
+    """
+    `priority` ordena pelo nível (`priority_rank`), não pelo texto. Os termos
+    expandidos seguem o índice `so_priority_rank_idx`, sem ordenação em memória.
+    """
+    ordering_aliases = {
+        'priority': ['priority_rank', '-created_at'],
+        '-priority': ['-priority_rank', 'created_at'],
+    }
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+
+        expanded = []
+        for term in ordering:
+            expanded.extend(self.ordering_aliases.get(term, [term]))
+        return expanded
@@ -0,0 +1,153 @@
+"""
+Header `Idempotency-Key` nos POSTs de criação e importação de ordens de serviço.
+
+A primeira requisição com a chave grava um IdempotencyKey "em andamento",
+executa normalmente e guarda a resposta de sucesso. Retentativas com a mesma
+chave e o mesmo corpo recebem a resposta guardada (header
+`Idempotent-Replayed: true`) sem validar nem gravar nada de novo. Respostas de
+erro não são guardadas: a retentativa executa de novo.
+
+Sem o header, uma chave derivada do conteúdo (ex.: o hash do arquivo importado)
+só detecta o reenvio: o conteúdo já processado é recusado com 409, e não
+respondido com o sucesso anterior, que pode não valer mais.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+# Uma requisição "em andamento" há mais tempo que isso foi interrompida (worker reiniciado).
+IN_PROGRESS_TIMEOUT = timedelta(minutes=10)
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Uma requisição com esta Idempotency-Key ainda está em andamento.'
+    default_code = 'idempotency_in_progress'
+
+
+class DuplicateContent(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = (
+        'Este arquivo já foi importado. Para importá-lo de novo, envie-o com uma Idempotency-Key nova.'
+    )
+    default_code = 'duplicate_content'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'Esta Idempotency-Key já foi usada com outro conteúdo.'
+    default_code = 'idempotency_key_reused'
+
+
+def upload_hash(upload):
+    """sha256 de um arquivo enviado, lido em blocos e sem consumir o arquivo."""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def request_hash(request):
+    upload = request.FILES.get('file')
+    if upload is not None:
+        return upload_hash(upload)
+    payload = json.dumps(request.data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def replay(record):
+    return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def run_idempotent(request, scope, key, fingerprint, handler, replay_success=True):
+    """
+    Executa `handler()` uma vez por (usuário, scope, key) a cada
+    IDEMPOTENCY_KEY_TTL horas; nas demais, devolve a resposta guardada ou,
+    com `replay_success=False`, levanta DuplicateContent.
+    """
+    record = IdempotencyKey.objects.filter(user=request.user, scope=scope, key=key).first()
+    if record is not None:
+        age = timezone.now() - record.created_at
+        expired = age > timedelta(hours=settings.IDEMPOTENCY_KEY_TTL) or (
+            record.status_code is None and age > IN_PROGRESS_TIMEOUT
+        )
+        if expired:
+            record.delete()
+        elif record.status_code is None:
+            raise IdempotencyConflict()
+        elif record.request_hash != fingerprint:
+            raise IdempotencyKeyReused()
+        elif not replay_success:
+            raise DuplicateContent()
+        else:
+            # Retentativa: uma consulta só, sem validação nem escrita.
+            return replay(record)
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(user=request.user, scope=scope, key=key, request_hash=fingerprint)
+    except IntegrityError:
+        # Outra requisição com a mesma chave chegou primeiro e ainda não terminou.
+        raise IdempotencyConflict()
+
+    try:
+        response = handler()
+    except BaseException:
+        record.delete()
+        raise
+
+    if status.is_success(response.status_code):
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=['status_code', 'response'])
+    else:
+        record.delete()
+    return response
+
+
+def idempotent(scope, duplicate_key=None):
+    """
+    Decorator de métodos de APIView. Sem o header, a requisição executa
+    normalmente, a menos que `duplicate_key(request, fingerprint)` gere uma
+    chave (ex.: o hash do arquivo importado): aí o conteúdo repetido recebe 409.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is not None and not 0 < len(key) <= 255:
+                raise ValidationError({HEADER: 'Deve ter entre 1 e 255 caracteres.'})
+
+            if key is None and duplicate_key is None:
+                return method(view, request, *args, **kwargs)
+
+            fingerprint = request_hash(request)
+            explicit = key is not None
+            if not explicit:
+                key = duplicate_key(request, fingerprint)
+
+            return run_idempotent(
+                request, scope, key, fingerprint, lambda: method(view, request, *args, **kwargs),
+                replay_success=explicit,
+            )
+        return wrapper
+    return decorator
+
+
+def content_key(request, fingerprint):
+    # O mesmo arquivo enviado de novo pelo mesmo usuário é reconhecido sem ser lido.
+    return f'sha256:{fingerprint}'
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.models import ServiceOrder
+from core.validators import make_cpf_key
+
+
+class Command(BaseCommand):
+    help = 'Preenche ServiceOrder.cpf_key a partir do CPF de cada ordem de serviço.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recalcula todas as chaves (ex.: depois de trocar CPF_HASH_KEY).'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = ServiceOrder.objects.exclude(cpf__isnull=True).order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(cpf_key__isnull=True)
+
+        updated = 0
+        last_pk = None
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            batch = list(batch.only('pk', 'cpf')[:batch_size])
+            if not batch:
+                break
+
+            for order in batch:
+                order.cpf_key = make_cpf_key(order.cpf)
+            ServiceOrder.objects.bulk_update(batch, ['cpf_key'])
+
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} ordens de serviço atualizadas.'))
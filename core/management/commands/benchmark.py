@@ -0,0 +1,290 @@
+import csv
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import ServiceOrder, User
+from core.renderers import FastJSONRenderer
+from core.seeding import SEED_PASSWORD, build_users, load_orders, order_rows
+from core.serializers import ServiceOrderSerializer
+from core.views import OrdemServicoList
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Scenario:
+    """
+    Callable medido; `prepare` e `cleanup` rodam fora da medição. Se `run`
+    retornar um número, ele entra no resultado como `bytes`.
+    """
+
+    def __init__(self, run, prepare=None, cleanup=None):
+        self.run = run
+        self.prepare = prepare or (lambda: None)
+        self.cleanup = cleanup or (lambda: None)
+
+
+def _summary(durations, queries, size=None):
+    durations = sorted(durations)
+    p95 = durations[min(len(durations) - 1, round(0.95 * (len(durations) - 1)))]
+    summary = {
+        'runs': len(durations),
+        'min_ms': round(durations[0] * 1000, 3),
+        'median_ms': round(statistics.median(durations) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'queries': queries,
+    }
+    if size is not None:
+        summary['bytes'] = size
+    return summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria um banco de teste com dados sintéticos, mede os cenários principais da API '
+        'e grava o resultado em JSON (opcionalmente comparando com uma execução anterior).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5, help='Execuções medidas por cenário.')
+        parser.add_argument('--csv-rows', default='10000', help='Tamanhos de importação CSV, ex.: 10000,100000.')
+        parser.add_argument('--login-burst', type=int, default=20, help='Logins por execução do cenário de login.')
+        parser.add_argument('--only', help='Roda só os cenários cujo nome contém este texto.')
+        parser.add_argument('--keepdb', action='store_true', help='Reaproveita o banco de teste (e os dados) entre execuções.')
+        parser.add_argument('--output', help='Arquivo JSON de saída (padrão: stdout).')
+        parser.add_argument('--compare', help='JSON de uma execução anterior para comparar.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Regressão tolerada na mediana (0.2 = 20%%) antes de falhar.'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.verbosity = options['verbosity']
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            self.seed()
+            # Os cenários (ex.: login_burst) medem a API, não os limites de uso.
+            with override_settings(RATE_LIMITING=False):
+                results = self.run_scenarios()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'users': options['users'],
+                'orders': options['orders'],
+                'seed': options['seed'],
+            },
+            'scenarios': results,
+        }
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+
+    def log(self, message):
+        if self.verbosity > 1 or self.options['output']:
+            self.stderr.write(message)
+
+    def seed(self):
+        users_wanted, orders_wanted = self.options['users'], self.options['orders']
+
+        if User.objects.count() < users_wanted:
+            User.objects.bulk_create(build_users(users_wanted, prefix='bench'), ignore_conflicts=True)
+        user_ids = list(User.objects.values_list('pk', flat=True))
+
+        existing = ServiceOrder.objects.count()
+        if existing < orders_wanted:
+            start = time.perf_counter()
+            load_orders(orders_wanted - existing, user_ids, seed=self.options['seed'], start=existing)
+            self.log(f'{orders_wanted - existing} ordens criadas em {time.perf_counter() - start:.1f}s')
+
+        self.user = User.objects.get(username='bench-0')
+        self.user.is_staff = True
+        self.user.save(update_fields=['is_staff'])
+
+    def scenarios(self):
+        list_url = reverse('ordem-list')
+        page_size = OrdemServicoList().paginator.page_size
+        last_page = max(1, -(-ServiceOrder.objects.count() // page_size))
+        since = (timezone.now() - timedelta(days=7)).isoformat()
+
+        yield 'list_page_first', self.api_get(list_url)
+        yield 'list_page_middle', self.api_get(list_url, {'page': max(1, last_page // 2)})
+        yield 'list_page_last', self.api_get(list_url, {'page': last_page})
+        yield 'search_recipient', self.api_get(list_url, {'search': 'Oliveira'})
+        yield 'search_protocol', self.api_get(list_url, {'search': 'SEED-000000123'})
+        yield 'filter_status', self.api_get(list_url, {'status': 'open'})
+        yield 'filter_status_in_last_week', self.api_get(list_url, {'status__in': 'open,in_progress', 'created_at__gte': since})
+        yield 'filter_priority_ordering', self.api_get(list_url, {'ordering': '-priority'})
+        yield 'login_burst', Scenario(self.login_burst)
+        yield 'sla_serializer_1000', Scenario(self.sla_serializer)
+
+        # Página grande: tempo de encode de cada renderer e bytes trafegados por codificação.
+        yield 'render_json_stdlib_100', self.render_page(JSONRenderer())
+        yield 'render_json_fast_100', self.render_page(FastJSONRenderer())
+        for encoding in ('identity', 'gzip', 'br'):
+            yield f'list_page_100_{encoding}', self.api_get(list_url, {'page_size': 100}, encoding=encoding)
+
+        for rows in self.options['csv_rows'].split(','):
+            if rows.strip():
+                yield f'csv_import_{int(rows)}', self.csv_import(int(rows))
+
+    def run_scenarios(self):
+        results = {}
+        for name, scenario in self.scenarios():
+            if self.options['only'] and self.options['only'] not in name:
+                continue
+
+            durations = []
+            for attempt in range(self.options['repeat'] + 1):
+                scenario.prepare()
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    size = scenario.run()
+                    elapsed = time.perf_counter() - start
+                scenario.cleanup()
+
+                # A primeira execução só aquece caches e conexões.
+                if attempt:
+                    durations.append(elapsed)
+
+            results[name] = _summary(durations, len(queries), size)
+            self.log(f"{name}: {results[name]['median_ms']} ms (mediana), {len(queries)} consultas")
+        return results
+
+    def client(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        return client
+
+    def api_get(self, url, params=None, encoding=None):
+        client = self.client()
+        headers = {'Accept-Encoding': encoding} if encoding else {}
+
+        def run():
+            response = client.get(url, params or {}, headers=headers)
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} {params} respondeu {response.status_code}.')
+            if encoding:
+                return len(response.content)
+        return Scenario(run)
+
+    def render_page(self, renderer):
+        page_size = 100
+        state = {}
+
+        def prepare():
+            if 'data' not in state:
+                orders = ServiceOrder.objects.select_related('created_by')[:page_size]
+                state['data'] = ServiceOrderSerializer(orders, many=True).data
+
+        def run():
+            return len(renderer.render(state['data'], 'application/json'))
+        return Scenario(run, prepare)
+
+    def login_burst(self):
+        client = APIClient()
+        url = reverse('token_obtain_pair')
+        for _ in range(self.options['login_burst']):
+            response = client.post(url, {'username': self.user.username, 'password': SEED_PASSWORD}, format='json')
+            if response.status_code != 200:
+                raise CommandError(f'Login respondeu {response.status_code}.')
+
+    def sla_serializer(self):
+        orders = list(ServiceOrder.objects.select_related('created_by')[:1000])
+        ServiceOrderSerializer(orders, many=True).data
+
+    def csv_import(self, rows):
+        client = self.client()
+        url = reverse('ordem-import-csv')
+        fields = ['protocol', 'so_number', 'type', 'status', 'recipient_name', 'cpf', 'provider', 'priority', 'description']
+        state = {'run': 0}
+
+        def prepare():
+            state['run'] += 1
+            state['prefix'] = f"CSV{state['run']}"
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(order_rows(rows, [], seed=self.options['seed'], prefix=state['prefix']))
+            state['upload'] = io.StringIO(buffer.getvalue())
+            state['upload'].name = 'benchmark.csv'
+
+        def run():
+            response = client.post(url, {'file': state['upload']}, format='multipart')
+            if response.status_code != 201:
+                raise CommandError(f'Importação CSV respondeu {response.status_code}.')
+
+        def cleanup():
+            # Mantém o volume do banco igual para os demais cenários.
+            ServiceOrder.objects.filter(protocol__startswith=f"{state['prefix']}-").delete()
+
+        return Scenario(run, prepare, cleanup)
+
+    def compare(self, results, baseline_path, threshold):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['scenarios']
+
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+
+            before, after = baseline[name]['median_ms'], result['median_ms']
+            change = (after - before) / before if before else 0
+            line = f'{name:32} {before:10.1f} ms -> {after:10.1f} ms ({change:+.0%})'
+            if change > threshold:
+                regressions.append(line)
+                line += '  REGRESSÃO'
+            self.stderr.write(line)
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} cenário(s) acima da tolerância de {threshold:.0%}.')
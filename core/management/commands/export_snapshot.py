@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.snapshots import HAS_PYARROW, export_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta as ordens de serviço alteradas desde a última execução para arquivos '
+        'Parquet em ANALYTICS_SNAPSHOT_DIR (exige pyarrow).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help='Diretório (padrão: ANALYTICS_SNAPSHOT_DIR).')
+        parser.add_argument('--full', action='store_true', help='Ignora a marca d\'água e exporta tudo.')
+        parser.add_argument('--batch-size', type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        if not HAS_PYARROW:
+            raise CommandError('Instale o pacote pyarrow para exportar o snapshot.')
+
+        directory = options['output'] or settings.ANALYTICS_SNAPSHOT_DIR
+        total, files = export_snapshot(directory, full=options['full'], batch_size=options['batch_size'])
+
+        size = sum(info['bytes'] for info in files)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} ordens exportadas em {len(files)} arquivo(s), {size / 1024:.0f} KiB, em {directory}.'
+        ))
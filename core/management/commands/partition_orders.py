@@ -0,0 +1,329 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import ServiceOrder, ServiceOrderStatus
+
+TABLE = ServiceOrder._meta.db_table
+LEGACY_TABLE = f'{TABLE}_legacy'
+ARCHIVE_TABLE = f'{TABLE}_archive'
+DEFAULT_PARTITION = f'{TABLE}_default'
+STAGING_TABLE = f'{TABLE}_staging'
+# Protocolos em uso (tabela principal e arquivo). Em tabela particionada, UNIQUE
+# precisa incluir created_at; a unicidade global fica nesta tabela, mantida por
+# trigger na mesma transação da escrita da ordem.
+PROTOCOL_TABLE = f'{TABLE}_protocol'
+PROTOCOL_FUNCTION = f'{TABLE}_protocol_sync'
+# Ligada (SET LOCAL) enquanto linhas mudam de tabela: os protocolos continuam reservados.
+RELOCATING_SETTING = 'core.relocating_orders'
+
+PROTOCOL_FUNCTION_SQL = f'''
+CREATE OR REPLACE FUNCTION {PROTOCOL_FUNCTION}() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('{RELOCATING_SETTING}', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM {PROTOCOL_TABLE} WHERE protocol = OLD.protocol;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {PROTOCOL_TABLE} (protocol) VALUES (NEW.protocol);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+'''
+
+# Só ordens encerradas vão para o arquivo; abertas continuam na tabela principal.
+ARCHIVABLE_STATUSES = [ServiceOrderStatus.COMPLETED.value, ServiceOrderStatus.CANCELLED.value]
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(value):
+    return month_start(value + timedelta(days=32))
+
+
+def month_ranges(start, end):
+    """
+    Intervalos mensais `[início, fim)` em UTC que cobrem de `start` até `end`.
+    """
+    current = month_start(start)
+    while current <= end:
+        upper = next_month(current)
+        yield current, upper
+        current = upper
+
+
+def partition_name(lower):
+    return f'{TABLE}_p{lower:%Y%m}'
+
+
+@contextmanager
+def relocating(cursor):
+    """
+    DELETE + INSERT de linhas que só mudam de tabela (partição padrão para a
+    nova partição, partição para o arquivo) sem liberar nem reservar protocolos.
+    """
+    cursor.execute(f"SET LOCAL {RELOCATING_SETTING} = 'on'")
+    yield
+    # Em caso de erro o rollback da transação desfaz o SET LOCAL.
+    cursor.execute(f"SET LOCAL {RELOCATING_SETTING} = 'off'")
+
+
+class Command(BaseCommand):
+    help = (
+        'Particiona core_serviceorder por mês de created_at (PostgreSQL), cria partições '
+        'futuras e move ordens encerradas antigas para core_serviceorder_archive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Converte a tabela atual em tabela particionada (uma vez, com a aplicação parada).'
+        )
+        parser.add_argument('--ahead', type=int, default=3, help='Meses futuros com partição criada.')
+        parser.add_argument(
+            '--archive-after',
+            type=int,
+            default=None,
+            help='Arquiva ordens encerradas de partições com mais de N dias.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('O particionamento só é suportado no PostgreSQL.')
+
+        with connection.cursor() as cursor:
+            partitioned = self.is_partitioned(cursor)
+            if options['convert']:
+                if partitioned:
+                    self.stdout.write(f'{TABLE} já é particionada.')
+                else:
+                    self.convert(cursor)
+            elif not partitioned:
+                raise CommandError(f'{TABLE} ainda não é particionada; rode com --convert.')
+
+            self.create_ahead(cursor, options['ahead'])
+            if options['archive_after'] is not None:
+                self.archive(cursor, options['archive_after'])
+
+    def is_partitioned(self, cursor):
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cursor.fetchone()
+        return row is not None and row[0] == 'p'
+
+    def existing_partitions(self, cursor):
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [TABLE],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def columns(self, cursor, table):
+        cursor.execute(
+            "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+            [table],
+        )
+        return cursor.fetchall()
+
+    def create_partition(self, cursor, lower, upper):
+        qn = connection.ops.quote_name
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {qn(partition_name(lower))} PARTITION OF {qn(TABLE)} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [lower, upper],
+        )
+
+    @transaction.atomic
+    def convert(self, cursor):
+        qn = connection.ops.quote_name
+
+        cursor.execute(f'LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = %s AND indexdef NOT LIKE 'CREATE UNIQUE%%'",
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(created_at) FROM {qn(TABLE)}')
+        oldest = cursor.fetchone()[0] or timezone.now()
+
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} RENAME TO {qn(LEGACY_TABLE)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(TABLE)} (LIKE {qn(LEGACY_TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (created_at)'
+        )
+        for lower, upper in month_ranges(oldest, timezone.now()):
+            self.create_partition(cursor, lower, upper)
+        cursor.execute(f'CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT')
+
+        cursor.execute(f'INSERT INTO {qn(TABLE)} SELECT * FROM {qn(LEGACY_TABLE)}')
+        cursor.execute(f'DROP TABLE {qn(LEGACY_TABLE)}')
+
+        # Em tabelas particionadas, chaves únicas precisam conter a chave de partição.
+        cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD PRIMARY KEY (id, created_at)')
+        cursor.execute(f'CREATE INDEX {qn(TABLE + "_protocol_idx")} ON {qn(TABLE)} (protocol)')
+        self.create_protocol_table(cursor)
+        # As definições foram lidas antes do RENAME e já apontam para o nome original.
+        for name, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}')
+
+        self.stdout.write(self.style.SUCCESS(f'{TABLE} convertida em tabela particionada por mês.'))
+
+    def create_protocol_table(self, cursor):
+        qn = connection.ops.quote_name
+        cursor.execute(f'CREATE TABLE {qn(PROTOCOL_TABLE)} (protocol varchar(100) PRIMARY KEY)')
+        cursor.execute(f'INSERT INTO {qn(PROTOCOL_TABLE)} (protocol) SELECT protocol FROM {qn(TABLE)}')
+        cursor.execute(PROTOCOL_FUNCTION_SQL)
+        # Protocolo repetido viola a chave primária de PROTOCOL_TABLE e a escrita
+        # da ordem falha com IntegrityError, como antes da conversão.
+        cursor.execute(
+            f'CREATE TRIGGER {qn(PROTOCOL_FUNCTION)} AFTER INSERT OR DELETE ON {qn(TABLE)} '
+            f'FOR EACH ROW EXECUTE FUNCTION {PROTOCOL_FUNCTION}()'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER {qn(PROTOCOL_FUNCTION + "_update")} AFTER UPDATE OF protocol ON {qn(TABLE)} '
+            f'FOR EACH ROW WHEN (OLD.protocol IS DISTINCT FROM NEW.protocol) EXECUTE FUNCTION {PROTOCOL_FUNCTION}()'
+        )
+
+    def create_ahead(self, cursor, ahead):
+        now = timezone.now()
+        end = month_start(now)
+        for _ in range(ahead):
+            end = next_month(end)
+
+        existing = self.existing_partitions(cursor)
+        created = moved = 0
+        for lower, upper in month_ranges(now, end):
+            if partition_name(lower) in existing:
+                continue
+            if DEFAULT_PARTITION in existing:
+                moved += self.split_default(cursor, lower, upper)
+            else:
+                self.create_partition(cursor, lower, upper)
+            created += 1
+
+        self.stdout.write(f'{created} partições futuras criadas; {moved} ordens movidas da partição padrão.')
+
+    @transaction.atomic
+    def split_default(self, cursor, lower, upper):
+        """
+        Cria a partição `[lower, upper)`. Ordens desse intervalo que estejam na
+        partição padrão impediriam a criação: saem dela antes e voltam depois,
+        já na partição nova. Retorna quantas foram movidas.
+        """
+        qn = connection.ops.quote_name
+        # Ninguém grava na partição padrão até a nova partição existir.
+        cursor.execute(f'LOCK TABLE {qn(DEFAULT_PARTITION)} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {qn(DEFAULT_PARTITION)} WHERE created_at >= %s AND created_at < %s)',
+            [lower, upper],
+        )
+        if not cursor.fetchone()[0]:
+            self.create_partition(cursor, lower, upper)
+            return 0
+
+        with relocating(cursor):
+            cursor.execute(f'CREATE TEMPORARY TABLE {qn(STAGING_TABLE)} (LIKE {qn(TABLE)})')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} '
+                f'WHERE created_at >= %s AND created_at < %s RETURNING *) '
+                f'INSERT INTO {qn(STAGING_TABLE)} SELECT * FROM moved',
+                [lower, upper],
+            )
+            moved = cursor.rowcount
+            self.create_partition(cursor, lower, upper)
+            cursor.execute(f'INSERT INTO {qn(TABLE)} SELECT * FROM {qn(STAGING_TABLE)}')
+            cursor.execute(f'DROP TABLE {qn(STAGING_TABLE)}')
+        return moved
+
+    def ensure_archive_table(self, cursor):
+        qn = connection.ops.quote_name
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {qn(ARCHIVE_TABLE)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS)'
+        )
+        # Ordens arquivadas são raramente lidas: textos longos vão comprimidos para o TOAST.
+        cursor.execute(f'ALTER TABLE {qn(ARCHIVE_TABLE)} SET (toast_tuple_target = 128)')
+        if connection.pg_version >= 140000:
+            for column in ('description', 'recipient_name'):
+                cursor.execute(f'ALTER TABLE {qn(ARCHIVE_TABLE)} ALTER COLUMN {qn(column)} SET COMPRESSION lz4')
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {qn(ARCHIVE_TABLE + "_protocol")} ON {qn(ARCHIVE_TABLE)} (protocol)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {qn(ARCHIVE_TABLE + "_cpf_key")} ON {qn(ARCHIVE_TABLE)} (cpf_key)'
+        )
+        return self.sync_archive_columns(cursor)
+
+    def sync_archive_columns(self, cursor):
+        """
+        O arquivo é criado uma vez, com as colunas da época. Colunas adicionadas
+        depois à tabela principal entram nele como anuláveis (ordens já arquivadas
+        ficam com NULL); colunas removidas de lá deixam de ser NOT NULL aqui.
+        Retorna as colunas da tabela principal, na ordem delas.
+        """
+        qn = connection.ops.quote_name
+        columns = self.columns(cursor, TABLE)
+        current = {name for name, _ in columns}
+        archived = {name for name, _ in self.columns(cursor, ARCHIVE_TABLE)}
+
+        for name, column_type in columns:
+            if name not in archived:
+                cursor.execute(f'ALTER TABLE {qn(ARCHIVE_TABLE)} ADD COLUMN {qn(name)} {column_type}')
+        for name in archived - current:
+            cursor.execute(f'ALTER TABLE {qn(ARCHIVE_TABLE)} ALTER COLUMN {qn(name)} DROP NOT NULL')
+        return [name for name, _ in columns]
+
+    def archive(self, cursor, days):
+        qn = connection.ops.quote_name
+        cutoff = timezone.now() - timedelta(days=days)
+        columns = ', '.join(connection.ops.quote_name(name) for name in self.ensure_archive_table(cursor))
+
+        archived = detached = 0
+        for name in sorted(self.existing_partitions(cursor)):
+            if name == DEFAULT_PARTITION:
+                continue
+
+            lower = datetime.strptime(name.rsplit('_p', 1)[1], '%Y%m').replace(tzinfo=dt_timezone.utc)
+            if next_month(lower) > cutoff:
+                continue
+
+            # Protocolos arquivados continuam reservados.
+            with transaction.atomic(), relocating(cursor):
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {qn(name)} WHERE status = ANY(%s) RETURNING {columns}) '
+                    f'INSERT INTO {qn(ARCHIVE_TABLE)} ({columns}) SELECT {columns} FROM moved',
+                    [ARCHIVABLE_STATUSES],
+                )
+                archived += cursor.rowcount
+
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {qn(name)})')
+                if not cursor.fetchone()[0]:
+                    cursor.execute(f'ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}')
+                    cursor.execute(f'DROP TABLE {qn(name)}')
+                    detached += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{archived} ordens arquivadas em {ARCHIVE_TABLE}; {detached} partições removidas.'
+        ))
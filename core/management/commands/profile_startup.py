@@ -0,0 +1,158 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Roda num interpretador novo (partida a frio): carrega a aplicação WSGI como o
+# servidor faria e faz a primeira requisição de cada caminho sem o django.test,
+# que importaria módulos que a aplicação não usa.
+BOOTSTRAP = '''
+import importlib, io, json, sys, time
+
+paths = json.loads(sys.argv[1])
+phases = {}
+started = time.perf_counter()
+
+from django.conf import settings
+settings.INSTALLED_APPS
+phases['settings'] = time.perf_counter() - started
+
+mark = time.perf_counter()
+module, name = settings.WSGI_APPLICATION.rsplit('.', 1)
+application = getattr(importlib.import_module(module), name)
+phases['wsgi'] = time.perf_counter() - mark
+
+host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+statuses = {}
+for label in ('first', 'second'):
+    for path in paths:
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': host,
+            'SERVER_PORT': '443', 'HTTP_HOST': host, 'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr, 'wsgi.version': (1, 0), 'wsgi.multithread': False,
+            'wsgi.multiprocess': True, 'wsgi.run_once': False,
+        }
+        mark = time.perf_counter()
+        response = application(environ, lambda status, headers, exc_info=None: statuses.__setitem__(path, status))
+        b''.join(response)
+        getattr(response, 'close', lambda: None)()
+        phases[f'{label} {path}'] = time.perf_counter() - mark
+
+phases['total'] = time.perf_counter() - started
+print(json.dumps({'phases': phases, 'statuses': statuses}))
+'''
+
+
+def parse_importtime(output):
+    """
+    Linhas de `python -X importtime`: `import time: self | cumulative | módulo`,
+    com o nome indentado conforme o aninhamento. Retorna {módulo: (self, cumulativo)} em ms.
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(own) / 1000, int(cumulative) / 1000)
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a partida a frio da aplicação (como num deploy serverless): tempo de '
+        'settings, carga da aplicação WSGI e primeira requisição, e o tempo de '
+        'importação por pacote e por módulo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Caminho requisitado após a carga (repetível). Padrão: hello/ e ordens-servico/.'
+        )
+        parser.add_argument('--runs', type=int, default=3, help='Partidas medidas; o relatório usa as medianas.')
+        parser.add_argument('--top', type=int, default=20, help='Quantos pacotes e módulos listar.')
+        parser.add_argument('--json', action='store_true', help='Saída em JSON.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/v1/hello/', '/api/v1/ordens-servico/']
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+
+        runs = []
+        for _ in range(options['runs']):
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', BOOTSTRAP, json.dumps(paths)],
+                capture_output=True,
+                text=True,
+                env=env,
+                cwd=settings.BASE_DIR,
+            )
+            if result.returncode != 0:
+                raise CommandError(f'A aplicação não iniciou:\n{result.stderr[-3000:]}')
+            runs.append((json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)))
+
+        report = self.summarize(runs, options['top'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def summarize(self, runs, top):
+        def median(values):
+            return round(statistics.median(values), 1)
+
+        phases = {
+            phase: median([data['phases'][phase] * 1000 for data, _ in runs])
+            for phase in runs[0][0]['phases']
+        }
+
+        # Tempo próprio somado por pacote raiz (numpy, django, rest_framework...).
+        packages = defaultdict(list)
+        for _, modules in runs:
+            totals = defaultdict(float)
+            for name, (own, _) in modules.items():
+                totals[name.split('.')[0]] += own
+            for package, total in totals.items():
+                packages[package].append(total)
+
+        modules = defaultdict(list)
+        for _, run_modules in runs:
+            for name, timing in run_modules.items():
+                modules[name].append(timing)
+
+        return {
+            'phases_ms': phases,
+            'statuses': runs[0][0]['statuses'],
+            'import_ms': median([sum(own for own, _ in run_modules.values()) for _, run_modules in runs]),
+            'modules_imported': len(runs[0][1]),
+            'packages_ms': dict(sorted(
+                ((package, median(totals)) for package, totals in packages.items()),
+                key=lambda item: -item[1],
+            )[:top]),
+            'modules_ms': [
+                {'module': name, 'self': median([own for own, _ in timings]), 'cumulative': median([cum for _, cum in timings])}
+                for name, timings in sorted(modules.items(), key=lambda item: -statistics.median(c for _, c in item[1]))[:top]
+            ],
+        }
+
+    def print_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING('Fases (mediana, ms)'))
+        for phase, value in report['phases_ms'].items():
+            self.stdout.write(f'  {phase:<45} {value:>9.1f}')
+        self.stdout.write(f"  status: {report['statuses']}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Importação: {report['import_ms']:.1f} ms em {report['modules_imported']} módulos. Por pacote (ms)"
+        ))
+        for package, value in report['packages_ms'].items():
+            self.stdout.write(f'  {package:<45} {value:>9.1f}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Módulos mais caros (cumulativo / próprio, ms)'))
+        for module in report['modules_ms']:
+            self.stdout.write(f"  {module['module']:<45} {module['cumulative']:>9.1f} {module['self']:>9.1f}")
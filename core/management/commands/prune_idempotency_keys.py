@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove chaves de idempotência vencidas (mais antigas que IDEMPOTENCY_KEY_TTL). '
+        'Retentativas com essas chaves voltam a executar a requisição.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.IDEMPOTENCY_KEY_TTL,
+            help='Mantém as chaves das últimas N horas.'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} chaves de idempotência removidas.'))
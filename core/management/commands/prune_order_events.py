@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ServiceOrderEvent
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove eventos de ordens de serviço antigos. Clientes SSE desconectados há '
+        'mais tempo que isso não conseguem retomar o stream pelo Last-Event-ID.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Mantém os eventos dos últimos N dias.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = ServiceOrderEvent.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} eventos removidos.'))
@@ -0,0 +1,44 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.sla import scan_sla
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = (
+        'Registra em alertas de SLA as ordens que ficaram próximas do vencimento ou '
+        'vencidas. Roda em loop a cada SLA_SCAN_INTERVAL segundos (ou uma vez, com --once).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Faz uma varredura e sai (ex.: via cron).')
+        parser.add_argument('--interval', type=int, default=None, help='Segundos entre varreduras (padrão: SLA_SCAN_INTERVAL).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.scan(options)
+            return
+
+        interval = options['interval'] or settings.SLA_SCAN_INTERVAL
+        while True:
+            started = time.monotonic()
+            try:
+                self.scan(options)
+            except Exception:
+                # Uma falha (banco fora do ar, deadlock) não derruba o processo: tenta de novo no próximo ciclo.
+                logger.exception('Varredura de SLA falhou.')
+
+            # Processo de longa duração: descarta conexões velhas como faria o ciclo de uma requisição.
+            close_old_connections()
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+
+    def scan(self, options):
+        overdue, nearing = scan_sla(batch_size=options['batch_size'])
+        if overdue or nearing or options['verbosity'] > 1:
+            self.stdout.write(f'{overdue} ordens vencidas e {nearing} próximas do vencimento.')
@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import ServiceOrder, User
+from core.seeding import SEED_PASSWORD, build_users, load_orders
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera ordens de serviço sintéticas (CPFs válidos, distribuições realistas, created_at '
+        'espalhado). No PostgreSQL grava com COPY em blocos paralelos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, required=True, help='Quantidade de ordens.')
+        parser.add_argument('--users', type=int, default=10, help='Usuários criadores (seed-0, seed-1...).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos paralelos (PostgreSQL).')
+        parser.add_argument('--chunk-size', type=int, default=100_000)
+        parser.add_argument('--days', type=int, default=365, help='Janela de created_at, em dias até hoje.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='SEED', help='Prefixo dos protocolos gerados.')
+
+    def handle(self, *args, **options):
+        User.objects.bulk_create(build_users(options['users']), ignore_conflicts=True)
+        user_ids = list(
+            User.objects.filter(username__in=[f'seed-{n}' for n in range(options['users'])])
+            .values_list('pk', flat=True)
+        )
+
+        # Continua a numeração de execuções anteriores com o mesmo prefixo.
+        start = ServiceOrder.objects.filter(protocol__startswith=f"{options['prefix']}-").count()
+
+        started = time.perf_counter()
+        created = load_orders(
+            options['count'],
+            user_ids,
+            seed=options['seed'],
+            start=start,
+            days=options['days'],
+            prefix=options['prefix'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        elapsed = time.perf_counter() - started
+
+        method = 'COPY' if connection.vendor == 'postgresql' else 'bulk_create'
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} ordens criadas em {elapsed:.1f}s via {method} ({created / elapsed:,.0f}/s). '
+            f'Usuários seed-0..seed-{options["users"] - 1}, senha "{SEED_PASSWORD}".'
+        ))
@@ -0,0 +1,96 @@
+"""
+Métricas por endpoint mantidas em memória, no formato de texto do Prometheus.
+
+Cada processo (worker do gunicorn/uvicorn) tem seus próprios histogramas; o
+Prometheus deve coletar cada worker ou somar as séries no servidor.
+"""
+import threading
+from bisect import bisect_left
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Contagem por faixa, soma e total; as faixas viram cumulativas na exportação.
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _label_text(self, label_values, extra=()):
+        pairs = [*zip(self.labels, label_values), *extra]
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+
+        for label_values, counts, total, count in sorted(series):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                labels = self._label_text(label_values, [('le', bound)])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{self._label_text(label_values)} {total}'
+            yield f'{self.name}_count{self._label_text(label_values)} {count}'
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_LABELS = ('view', 'method', 'status')
+VIEW_LABELS = ('view', 'method')
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Tempo total da requisição.', DURATION_BUCKETS, REQUEST_LABELS
+)
+db_query_count = Histogram(
+    'db_queries_per_request', 'Consultas SQL por requisição.', COUNT_BUCKETS, VIEW_LABELS
+)
+db_duration = Histogram(
+    'db_duration_seconds', 'Tempo gasto em SQL por requisição.', DURATION_BUCKETS, VIEW_LABELS
+)
+render_duration = Histogram(
+    'render_duration_seconds',
+    'Tempo do renderer (encode do corpo da resposta); não inclui os serializers do DRF, que rodam na view.',
+    DURATION_BUCKETS,
+    VIEW_LABELS,
+)
+response_size = Histogram(
+    'http_response_size_bytes', 'Tamanho do corpo da resposta.', SIZE_BUCKETS, VIEW_LABELS
+)
+
+HISTOGRAMS = (request_duration, db_query_count, db_duration, render_duration, response_size)
+
+
+def render_prometheus():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
@@ -0,0 +1,519 @@
+import gzip
+import io
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework import exceptions
+from rest_framework.fields import Field
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import Serializer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import metrics
+from .db_routers import pin_to_primary, unpin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REPLICA_PIN_KEY = 'db-pin:{}'
+
+logger = logging.getLogger(__name__)
+
+
+def _request_user_id(request):
+    """
+    Identifica o usuário sem consultar o banco: pela claim do JWT ou pelo id
+    gravado na sessão.
+    """
+    authentication = JWTAuthentication()
+    try:
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is not None:
+            return str(authentication.get_validated_token(raw_token)[jwt_settings.USER_ID_CLAIM])
+    except (exceptions.APIException, KeyError):
+        pass
+
+    session = getattr(request, 'session', None)
+    if session is not None:
+        return session.get('_auth_user_id')
+    return None
+
+
+@sync_and_async_middleware
+def replica_pinning_middleware(get_response):
+    """
+    Read-your-writes com réplicas de leitura: requisições de escrita usam só o
+    primário e, por DATABASE_REPLICA_PIN_SECONDS depois de escrever, as leituras
+    do mesmo usuário também vão para o primário.
+    """
+    if not settings.DATABASE_REPLICAS:
+        raise MiddlewareNotUsed()
+
+    cache = caches['shared']
+
+    def start(request):
+        user_id = _request_user_id(request)
+        pinned = request.method not in SAFE_METHODS or (
+            user_id is not None and cache.get(REPLICA_PIN_KEY.format(user_id)) is not None
+        )
+        return user_id, pin_to_primary(pinned)
+
+    def finish(request, response, user_id, token):
+        unpin(token)
+
+        wrote = request.method not in SAFE_METHODS and response.status_code < 400
+        if wrote and user_id is not None:
+            cache.set(REPLICA_PIN_KEY.format(user_id), 1, settings.DATABASE_REPLICA_PIN_SECONDS)
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            user_id, token = start(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                unpin(token)
+                raise
+            return finish(request, response, user_id, token)
+    else:
+        def middleware(request):
+            user_id, token = start(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                unpin(token)
+                raise
+            return finish(request, response, user_id, token)
+
+    return middleware
+
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    request_metrics = _current_metrics.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    return request_metrics(execute, sql, params, many, context)
+
+
+def _install_query_counter(connection, **kwargs):
+    # Instalado em toda conexão, de qualquer thread: no ASGI as consultas do ORM
+    # rodam via sync_to_async numa thread do executor, que herda o contexto da
+    # requisição (e com ele _current_metrics). No início da lista, para não ser
+    # removido pelo pop() de um connection.execute_wrapper() em andamento.
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+class _RequestMetrics:
+    """
+    Acumula os números de uma requisição; também serve de execute_wrapper
+    para contar as consultas SQL e o tempo gasto nelas.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = None
+        self._render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += perf_counter() - start
+
+    def start_render(self, response):
+        self._render_started = perf_counter()
+        response.add_post_render_callback(self.finish_render)
+
+    def finish_render(self, response):
+        self.render_time = perf_counter() - self._render_started
+
+
+class MetricsMiddleware:
+    """
+    Mede as requisições amostradas (METRICS_SAMPLE_RATE): view resolvida,
+    consultas SQL, tempo do renderer e tamanho da resposta. Os números vão
+    para o header Server-Timing e para os histogramas de core.metrics (/metrics).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.METRICS_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+        connection_created.connect(_install_query_counter)
+        # Conexões desta thread abertas antes do middleware carregar (checagens na partida).
+        for connection in connections.all(initialized_only=True):
+            _install_query_counter(connection)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        request._metrics = _RequestMetrics()
+        token = _current_metrics.set(request._metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.record(request, response)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        request._metrics = _RequestMetrics()
+        token = _current_metrics.set(request._metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.record(request, response)
+
+    def process_template_response(self, request, response):
+        # Respostas do DRF e TemplateResponse são renderizadas depois da view.
+        request_metrics = getattr(request, '_metrics', None)
+        if request_metrics is not None:
+            request_metrics.start_render(response)
+        return response
+
+    def record(self, request, response):
+        request_metrics = request._metrics
+        total = perf_counter() - request_metrics.started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        method = request.method
+
+        metrics.request_duration.observe(total, view, method, str(response.status_code))
+        metrics.db_query_count.observe(request_metrics.queries, view, method)
+        metrics.db_duration.observe(request_metrics.db_time, view, method)
+        if request_metrics.render_time is not None:
+            metrics.render_duration.observe(request_metrics.render_time, view, method)
+        if not response.streaming:
+            metrics.response_size.observe(len(response.content), view, method)
+
+        timings = [f'db;dur={request_metrics.db_time * 1000:.1f};desc="{request_metrics.queries} queries"']
+        if request_metrics.render_time is not None:
+            timings.append(f'render;dur={request_metrics.render_time * 1000:.1f}')
+        timings.append(f'total;dur={total * 1000:.1f}')
+        if response.has_header('Server-Timing'):
+            timings.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+class QueryInspectionError(Exception):
+    pass
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Listas de IN com tamanhos diferentes têm o mesmo formato.
+_IN_PLACEHOLDERS = re.compile(r'\((?:%s, )+%s\)')
+
+
+def _query_origin():
+    """
+    Campo de serializer que disparou a consulta (se houver) e os frames do app.
+    """
+    serializer_field = None
+    app_frames = []
+
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if serializer_field is None and code.co_name == 'to_representation':
+            serializer, field = frame.f_locals.get('self'), frame.f_locals.get('field')
+            if isinstance(serializer, Serializer) and isinstance(field, Field):
+                serializer_field = f'{type(serializer).__name__}.{field.field_name}'
+
+        if code.co_filename.startswith(APP_DIR) and code.co_filename != __file__:
+            path = os.path.relpath(code.co_filename, os.path.dirname(APP_DIR))
+            app_frames.append(f'{path}:{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+
+    return serializer_field, app_frames
+
+
+class _QueryRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append((sql, perf_counter() - start, _query_origin()))
+
+    def problems(self, repeat_threshold, slow_seconds):
+        by_shape = defaultdict(list)
+        for sql, duration, origin in self.statements:
+            if sql.lstrip()[:6].upper() == 'SELECT':
+                by_shape[_IN_PLACEHOLDERS.sub('(%s...)', sql)].append(origin)
+
+        for shape, origins in by_shape.items():
+            if len(origins) >= repeat_threshold:
+                field, frames = origins[-1]
+                yield self.describe(f'N+1: {len(origins)} consultas iguais', shape, field, frames)
+
+        for sql, duration, (field, frames) in self.statements:
+            if duration >= slow_seconds:
+                yield self.describe(f'Consulta lenta ({duration * 1000:.0f} ms)', sql, field, frames)
+
+    @staticmethod
+    def describe(title, sql, field, frames):
+        lines = [f'{title}: {sql}']
+        if field:
+            lines.append(f'  campo do serializer: {field}')
+        lines.extend(f'  {frame}' for frame in frames)
+        return '\n'.join(lines)
+
+
+class QueryInspectorMiddleware:
+    """
+    Detector de N+1 e de consultas lentas para desenvolvimento e testes
+    (QUERY_INSPECTOR=True). Registra o SQL de cada requisição e aponta consultas
+    SELECT do mesmo formato repetidas QUERY_INSPECTOR_REPEAT_THRESHOLD vezes ou
+    mais e consultas acima de QUERY_INSPECTOR_SLOW_MS. Com QUERY_INSPECTOR_RAISE
+    os problemas viram exceção (usado nos testes); senão vão para o log.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_INSPECTOR:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        recorder = _QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        self.report(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = _QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = await self.get_response(request)
+        self.report(request, recorder)
+        return response
+
+    def report(self, request, recorder):
+        problems = list(recorder.problems(
+            settings.QUERY_INSPECTOR_REPEAT_THRESHOLD,
+            settings.QUERY_INSPECTOR_SLOW_MS / 1000,
+        ))
+        if not problems:
+            return
+
+        message = f'{request.method} {request.path}\n' + '\n\n'.join(problems)
+        if settings.QUERY_INSPECTOR_RAISE:
+            raise QueryInspectionError(message)
+        logger.warning(message)
+
+
+# Tipos que compensam comprimir; SSE fica de fora para cada evento sair na hora.
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'application/msgpack')
+INCOMPRESSIBLE_TYPES = ('text/event-stream',)
+# Equivalente, em tempo de CPU, ao gzip nível 6; as qualidades altas são para arquivos estáticos.
+BROTLI_QUALITY = 5
+
+
+def _accepted_encodings(header):
+    """`Accept-Encoding` -> {codificação: q}, sem as recusadas (q=0)."""
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted[name.lower()] = quality
+    return accepted
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # Nome aleatório no cabeçalho gzip, como o GZipMiddleware do Django (mitiga BREACH).
+        self._buffer = io.BytesIO()
+        self._file = gzip.GzipFile(
+            filename=secrets.token_hex(random.randint(1, 50)), mode='wb',
+            compresslevel=level, fileobj=self._buffer, mtime=0,
+        )
+
+    def _read(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def compress(self, chunk):
+        self._file.write(chunk)
+        # Sync flush: o trecho sai já, sem esperar o buffer do zlib encher.
+        self._file.flush()
+        return self._read()
+
+    def finish(self):
+        self._file.close()
+        return self._read()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas com brotli (se o pacote estiver instalado) ou gzip,
+    conforme o `Accept-Encoding`. Respostas comuns só a partir de
+    COMPRESSION_MIN_SIZE bytes e se ficarem menores; respostas em streaming são
+    comprimidas trecho a trecho, sem segurar o envio.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION:
+            raise MiddlewareNotUsed()
+
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.level = settings.COMPRESSION_LEVEL
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def encoding(self, request):
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        options = [name for name in (('br', 'gzip') if brotli is not None else ('gzip',)) if name in accepted]
+        # Empate de q: brotli comprime mais que gzip no mesmo tempo.
+        return max(options, key=lambda name: accepted[name], default=None)
+
+    def stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(BROTLI_QUALITY)
+        return _GzipStream(self.level)
+
+    def compress(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type in INCOMPRESSIBLE_TYPES or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response.streaming_content, encoding, response.is_async)
+            del response.headers['Content-Length']
+        else:
+            stream = self.stream(encoding)
+            compressed = stream.compress(response.content) + stream.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # ETag forte deixa de valer para o corpo comprimido (RFC 9110, 8.8.1).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def compress_stream(self, content, encoding, is_async):
+        stream = self.stream(encoding)
+        if is_async:
+            async def compressed():
+                async for chunk in content:
+                    data = stream.compress(chunk)
+                    if data:
+                        yield data
+                yield stream.finish()
+            return compressed()
+
+        def compressed():
+            for chunk in content:
+                data = stream.compress(chunk)
+                if data:
+                    yield data
+            yield stream.finish()
+        return compressed()
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+PRIORITY_RANK = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+
+
+def fill_priority_rank(apps, schema_editor):
+    ServiceOrder = apps.get_model('core', 'ServiceOrder')
+    for priority, rank in PRIORITY_RANK.items():
+        ServiceOrder.objects.filter(priority=priority).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_serviceorder_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serviceorder',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False, verbose_name='Nível da prioridade'),
+        ),
+        migrations.RunPython(fill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='serviceorder',
+            index=models.Index(fields=['-priority_rank', 'created_at'], name='so_priority_rank_idx'),
+        ),
+    ]
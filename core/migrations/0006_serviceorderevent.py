@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:01
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_serviceorder_priority_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceOrderEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.UUIDField(verbose_name='Ordem de serviço')),
+                ('action', models.CharField(choices=[('created', 'Criada'), ('updated', 'Alterada'), ('deleted', 'Removida')], max_length=10, verbose_name='Ação')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Dados')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Criado em')),
+                ('created_by', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+            ],
+            options={
+                'verbose_name': 'Evento de Ordem de Serviço',
+                'verbose_name_plural': 'Eventos de Ordens de Serviço',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['created_by', 'id'], name='so_event_owner_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:40
+
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+SLA_HOURS = {'high': 24, 'medium': 48}
+DEFAULT_SLA_HOURS = 72
+SLA_WARNING = timedelta(hours=4)
+
+
+def fill_due_at(apps, schema_editor):
+    ServiceOrder = apps.get_model('core', 'ServiceOrder')
+    for priority, hours in SLA_HOURS.items():
+        ServiceOrder.objects.filter(priority=priority).update(due_at=F('created_at') + timedelta(hours=hours))
+    ServiceOrder.objects.exclude(priority__in=list(SLA_HOURS)).update(
+        due_at=F('created_at') + timedelta(hours=DEFAULT_SLA_HOURS)
+    )
+
+    # Marca a faixa atual como já alertada: o primeiro scan_sla só registra
+    # transições novas, em vez de um alerta por ordem vencida do histórico.
+    now = django.utils.timezone.now()
+    ServiceOrder.objects.filter(due_at__lt=now).update(sla_alert_level=2)
+    ServiceOrder.objects.filter(due_at__gte=now, due_at__lt=now + SLA_WARNING).update(sla_alert_level=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_serviceorderevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='serviceorder',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Criado em'),
+        ),
+        migrations.AddField(
+            model_name='serviceorder',
+            name='due_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Prazo'),
+        ),
+        migrations.AddField(
+            model_name='serviceorder',
+            name='sla_alert_level',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'No prazo'), (1, 'Próxima do vencimento'), (2, 'Vencida')], default=0, editable=False, verbose_name='Alerta de SLA'),
+        ),
+        migrations.RunPython(fill_due_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='serviceorder',
+            name='due_at',
+            field=models.DateTimeField(editable=False, verbose_name='Prazo'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceorder',
+            index=models.Index(condition=models.Q(('sla_alert_level__lt', 2), models.Q(('status', 'completed'), _negated=True)), fields=['sla_alert_level', 'due_at'], name='so_sla_pending_idx'),
+        ),
+        migrations.CreateModel(
+            name='SlaAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField(choices=[(0, 'No prazo'), (1, 'Próxima do vencimento'), (2, 'Vencida')], verbose_name='Faixa')),
+                ('due_at', models.DateTimeField(verbose_name='Prazo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='sla_alerts', to='core.serviceorder', verbose_name='Ordem de serviço')),
+            ],
+            options={
+                'verbose_name': 'Alerta de SLA',
+                'verbose_name_plural': 'Alertas de SLA',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -1,9 +1,14 @@
 import uuid
+from datetime import timedelta
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .validators import make_cpf_key
+
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
@@ -17,6 +22,9 @@ class User(AbstractUser):
         verbose_name = _('User')
         verbose_name_plural = _('Users')
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(fields=['-date_joined', '-id'], name='auth_user_joined_id_idx'),
+        ]
 
 class ServiceOrderType(models.TextChoices):
     ADMINISTRATIVE = 'administrative', _('Administrativa')
@@ -57,6 +65,58 @@ class ServiceOrderPriority(models.TextChoices):
     MEDIUM = 'medium', _('Média')
     LOW = 'low', _('Baixa')
 
+# Ordem semântica das prioridades, usada para ordenar a fila de atendimento.
+PRIORITY_RANK = {
+    ServiceOrderPriority.LOW: 1,
+    ServiceOrderPriority.MEDIUM: 2,
+    ServiceOrderPriority.HIGH: 3,
+    ServiceOrderPriority.CRITICAL: 4,
+}
+
+
+# Prazo de atendimento (horas a partir da criação) por prioridade.
+SLA_HOURS = {
+    ServiceOrderPriority.HIGH: 24,
+    ServiceOrderPriority.MEDIUM: 48,
+}
+DEFAULT_SLA_HOURS = 72
+# Faltando menos que isso, a ordem está "próxima do vencimento".
+SLA_WARNING = timedelta(hours=4)
+
+
+class SlaAlertLevel(models.IntegerChoices):
+    NONE = 0, _('No prazo')
+    NEARING_DUE_DATE = 1, _('Próxima do vencimento')
+    OVERDUE = 2, _('Vencida')
+
+
+def sla_due_at(created_at, priority):
+    return created_at + timedelta(hours=SLA_HOURS.get(priority, DEFAULT_SLA_HOURS))
+
+
+def sla_level(due_at, now):
+    if due_at < now:
+        return SlaAlertLevel.OVERDUE
+    if due_at - now < SLA_WARNING:
+        return SlaAlertLevel.NEARING_DUE_DATE
+    return SlaAlertLevel.NONE
+
+
+class ServiceOrderQuerySet(models.QuerySet):
+    def for_cpf(self, cpf):
+        cpf_key = make_cpf_key(cpf)
+        # CPF inválido não tem chave: filtrar por NULL traria as ordens sem chave.
+        if cpf_key is None:
+            return self.none()
+        return self.filter(cpf_key=cpf_key)
+
+    def sla_pending(self):
+        """
+        Ordens que ainda podem gerar alerta de SLA. É o mesmo predicado do índice
+        parcial so_sla_pending_idx, que só contém essas ordens.
+        """
+        return self.filter(sla_alert_level__lt=SlaAlertLevel.OVERDUE).exclude(status=ServiceOrderStatus.COMPLETED)
+
 
 class ServiceOrder(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -87,9 +147,22 @@ class ServiceOrder(models.Model):
         default=ServiceOrderPriority.MEDIUM,
         verbose_name=_("Prioridade")
     )
+    priority_rank = models.PositiveSmallIntegerField(
+        default=PRIORITY_RANK[ServiceOrderPriority.MEDIUM],
+        editable=False,
+        verbose_name=_("Nível da prioridade")
+    )
 
     recipient_name = models.CharField(max_length=255, verbose_name=_("Nome do Recebedor/Cliente"))
     cpf = models.CharField(max_length=14, blank=True, null=True, verbose_name=_("CPF"))
+    cpf_key = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+        verbose_name=_("Chave do CPF")
+    )
     
     description = models.TextField(verbose_name=_("Descrição"))
     
@@ -102,13 +175,156 @@ class ServiceOrder(models.Model):
         verbose_name=_("Criado por")
     )
 
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Criado em"))
+    # Default em vez de auto_now_add: due_at é calculado a partir dele antes do INSERT.
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name=_("Criado em"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Atualizado em"))
 
+    due_at = models.DateTimeField(editable=False, verbose_name=_("Prazo"))
+    # Última faixa de SLA já alertada (comando scan_sla).
+    sla_alert_level = models.PositiveSmallIntegerField(
+        choices=SlaAlertLevel.choices,
+        default=SlaAlertLevel.NONE,
+        editable=False,
+        verbose_name=_("Alerta de SLA")
+    )
+
+    objects = ServiceOrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("Ordem de Serviço")
         verbose_name_plural = _("Ordens de Serviço")
         ordering = ['-created_at']
+        # Índices dos filtros de ServiceOrderFilter (a listagem ordena por -created_at).
+        indexes = [
+            models.Index(fields=['-created_at'], name='so_created_idx'),
+            models.Index(fields=['-updated_at'], name='so_updated_idx'),
+            models.Index(fields=['status', '-created_at'], name='so_status_created_idx'),
+            models.Index(fields=['priority', '-created_at'], name='so_priority_created_idx'),
+            # `?ordering=-priority`: mais urgentes primeiro e, em cada nível, as mais antigas.
+            models.Index(fields=['-priority_rank', 'created_at'], name='so_priority_rank_idx'),
+            # Varredura de SLA: só ordens pendentes, que saem do índice ao vencer ou concluir.
+            models.Index(
+                fields=['sla_alert_level', 'due_at'],
+                condition=models.Q(sla_alert_level__lt=SlaAlertLevel.OVERDUE) & ~models.Q(status=ServiceOrderStatus.COMPLETED),
+                name='so_sla_pending_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"O.S. {self.so_number} ({self.get_status_display()})"
+
+    def save(self, *args, **kwargs):
+        self.cpf_key = make_cpf_key(self.cpf)
+        self.priority_rank = PRIORITY_RANK.get(self.priority, self.priority_rank)
+
+        due_at = sla_due_at(self.created_at, self.priority)
+        if due_at != self.due_at:
+            # Novo prazo: scan_sla volta a avaliar a ordem desde o início.
+            self.due_at = due_at
+            self.sla_alert_level = SlaAlertLevel.NONE
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'cpf' in update_fields:
+                update_fields.add('cpf_key')
+            if 'priority' in update_fields:
+                update_fields.add('priority_rank')
+            if update_fields & {'priority', 'created_at'}:
+                update_fields.update(['due_at', 'sla_alert_level'])
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+
+
+class ServiceOrderEventAction(models.TextChoices):
+    CREATED = 'created', _('Criada')
+    UPDATED = 'updated', _('Alterada')
+    DELETED = 'deleted', _('Removida')
+
+
+class ServiceOrderEvent(models.Model):
+    """
+    Alteração de uma ordem de serviço, transmitida em /ordens-servico/eventos/.
+    O id (sequencial) é o id do evento no SSE e o ponto de retomada do cliente.
+    """
+    # Sem chave estrangeira: o evento de remoção sobrevive à ordem.
+    order_id = models.UUIDField(verbose_name=_("Ordem de serviço"))
+    action = models.CharField(max_length=10, choices=ServiceOrderEventAction.choices, verbose_name=_("Ação"))
+    # Dono da ordem no momento do evento; define quem recebe o evento.
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        db_index=False,
+        verbose_name=_("Criado por")
+    )
+    payload = models.JSONField(encoder=DjangoJSONEncoder, verbose_name=_("Dados"))
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_("Criado em"))
+
+    class Meta:
+        verbose_name = _("Evento de Ordem de Serviço")
+        verbose_name_plural = _("Eventos de Ordens de Serviço")
+        ordering = ['id']
+        # Também atende a chave estrangeira, que por isso não tem índice próprio.
+        indexes = [
+            models.Index(fields=['created_by', 'id'], name='so_event_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.order_id}"
+
+
+class SlaAlert(models.Model):
+    """
+    Ordem que entrou em uma nova faixa de SLA, registrada pelo comando scan_sla.
+    """
+    # Sem constraint no banco: a chave primária de core_serviceorder particionada
+    # é (id, created_at) e não pode ser referenciada só pelo id.
+    order = models.ForeignKey(
+        ServiceOrder,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='sla_alerts',
+        verbose_name=_("Ordem de serviço")
+    )
+    level = models.PositiveSmallIntegerField(choices=SlaAlertLevel.choices, verbose_name=_("Faixa"))
+    due_at = models.DateTimeField(verbose_name=_("Prazo"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Criado em"))
+
+    class Meta:
+        verbose_name = _("Alerta de SLA")
+        verbose_name_plural = _("Alertas de SLA")
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.get_level_display()} {self.order_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Resposta de uma requisição com `Idempotency-Key` (ou de uma importação, pelo
+    hash do arquivo), repetida às retentativas do cliente sem executar de novo.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False, verbose_name=_("Usuário"))
+    scope = models.CharField(max_length=50, verbose_name=_("Endpoint"))
+    key = models.CharField(max_length=255, verbose_name=_("Chave"))
+    # Hash do corpo: a mesma chave com outro corpo é erro do cliente, não retentativa.
+    request_hash = models.CharField(max_length=64, verbose_name=_("Hash da requisição"))
+    # Vazio enquanto a primeira requisição está em andamento.
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name=_("Status"))
+    response = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True, verbose_name=_("Resposta"))
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name=_("Criado em"))
+
+    class Meta:
+        verbose_name = _("Chave de Idempotência")
+        verbose_name_plural = _("Chaves de Idempotência")
+        # Também atende a chave estrangeira, que por isso não tem índice próprio.
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='idempotency_key_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
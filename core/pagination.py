@@ -1,4 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class CustomPagination(PageNumberPagination):
     page_size = 10
@@ -6,3 +13,82 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
 
     max_page_size = 100
+
+
+def encode_keyset_cursor(position):
+    value, pk = position
+    raw = f"{value.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_keyset_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.split('|', 1)
+    except (TypeError, ValueError):
+        raise ValueError('Cursor inválido.')
+
+    value = parse_datetime(value)
+    if value is None or not pk:
+        raise ValueError('Cursor inválido.')
+    return value, pk
+
+
+def keyset_filter(queryset, cursor, field='date_joined'):
+    """
+    Ordena por (field, id) decrescente e, se houver cursor, continua a partir
+    dele com `WHERE field < x OR (field = x AND id < y)`, sem OFFSET nem COUNT.
+    """
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    if not cursor:
+        return queryset
+
+    value, pk = decode_keyset_cursor(cursor)
+    try:
+        return queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    except ValidationError:
+        raise ValueError('Cursor inválido.')
+
+
+class KeysetPagination(BasePagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    keyset_field = 'date_joined'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        try:
+            queryset = keyset_filter(queryset, request.query_params.get(self.cursor_query_param), self.keyset_field)
+        except ValueError as e:
+            raise NotFound(str(e))
+
+        results = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            last = results[-1]
+            self.next_cursor = encode_keyset_cursor((getattr(last, self.keyset_field), last.pk))
+        return results
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
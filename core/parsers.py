@@ -0,0 +1,49 @@
+"""
+Parsers da API.
+"""
+import uuid
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.settings import api_settings
+
+from .renderers import MSGPACK_ENUMS, msgpack
+
+
+def expand(data):
+    """
+    Inverso de renderers.compact: 16 bytes viram UUID e códigos de choices
+    voltam a ser o valor, para os serializers receberem os mesmos dados do JSON.
+    """
+    if isinstance(data, dict):
+        return {key: _expand_field(key, value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [expand(item) for item in data]
+    if isinstance(data, bytes) and len(data) == 16:
+        return str(uuid.UUID(bytes=data))
+    return data
+
+
+def _expand_field(key, value):
+    values = MSGPACK_ENUMS.get(key)
+    if values is not None and type(value) is int and 0 <= value < len(values):
+        return values[value]
+    return expand(value)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return expand(msgpack.unpackb(stream.read(), raw=False))
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack inválido: {exc}')
+
+
+def parser_classes_with_msgpack(parser_classes=None):
+    """Parsers padrão mais MessagePack, se o pacote estiver instalado."""
+    parser_classes = list(parser_classes or api_settings.DEFAULT_PARSER_CLASSES)
+    if msgpack is not None:
+        parser_classes.append(MessagePackParser)
+    return parser_classes
@@ -0,0 +1,120 @@
+"""
+Renderers da API.
+"""
+import uuid
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import ServiceOrderPriority, ServiceOrderStatus, ServiceOrderType, ServiceProviderType
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Datas UTC terminam em "Z", como no encoder do DRF.
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer com orjson, quando instalado: mesma saída compacta em UTF-8 do
+    DRF, várias vezes mais rápida. UUID e datas são tratados pelo orjson; o que
+    ele não conhece (Decimal, textos traduzíveis...) passa pelo encoder do DRF.
+    Com indentação pedida no Accept, ou sem orjson, usa o json da stdlib.
+    """
+
+    _default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self._default, option=ORJSON_OPTIONS)
+        # Como o JSONRenderer: U+2028/U+2029 escapados para o JSON valer como JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+# MessagePack: choices vão como a posição do valor na lista de choices do model
+# (valores novos entram sempre no fim) e UUIDs como 16 bytes.
+MSGPACK_ENUMS = {
+    'type': ServiceOrderType.values,
+    'status': ServiceOrderStatus.values,
+    'provider': ServiceProviderType.values,
+    'priority': ServiceOrderPriority.values,
+}
+MSGPACK_UUID_FIELDS = {'id', 'ids', 'order'}
+_ENUM_CODES = {field: {value: code for code, value in enumerate(values)} for field, values in MSGPACK_ENUMS.items()}
+
+
+def _uuid_bytes(value):
+    if isinstance(value, list):
+        return [_uuid_bytes(item) for item in value]
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    if isinstance(value, str) and len(value) == 36:
+        try:
+            return uuid.UUID(value).bytes
+        except ValueError:
+            pass
+    return value
+
+
+def compact(data):
+    """
+    Troca, nos campos conhecidos, UUIDs por 16 bytes e choices pelo código.
+    """
+    if isinstance(data, dict):
+        return {key: _compact_field(key, value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [compact(item) for item in data]
+    return data
+
+
+def _compact_field(key, value):
+    if key in MSGPACK_UUID_FIELDS:
+        return _uuid_bytes(value)
+    codes = _ENUM_CODES.get(key)
+    if codes is not None and isinstance(value, str) and value in codes:
+        return codes[value]
+    return compact(value)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack para clientes internos (`Accept: application/msgpack` ou
+    `?format=msgpack`). Exige o pacote msgpack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    _json_default = JSONEncoder().default
+
+    def _default(self, obj):
+        if isinstance(obj, uuid.UUID):
+            return obj.bytes
+        return self._json_default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(compact(data), default=self._default, use_bin_type=True)
+
+
+def renderer_classes_with_msgpack(renderer_classes=None):
+    """Renderers padrão mais MessagePack, se o pacote estiver instalado."""
+    renderer_classes = list(renderer_classes or api_settings.DEFAULT_RENDERER_CLASSES)
+    if msgpack is not None:
+        renderer_classes.append(MessagePackRenderer)
+    return renderer_classes
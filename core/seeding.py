@@ -0,0 +1,243 @@
+"""
+Dados sintéticos (usuários e ordens de serviço) para benchmarks e testes de carga.
+"""
+import csv
+import io
+import multiprocessing
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.utils import timezone
+
+from .models import (
+    PRIORITY_RANK,
+    ServiceOrder,
+    ServiceOrderPriority,
+    ServiceOrderStatus,
+    ServiceOrderType,
+    ServiceProviderType,
+    User,
+    sla_due_at,
+    sla_level,
+)
+from .validators import generate_cpf, make_cpf_key
+
+SEED_PASSWORD = 'seed-password'
+
+# Distribuições aproximadas de uma operação de manutenção real.
+TYPE_WEIGHTS = {
+    ServiceOrderType.CORRECTIVE_MAINTENANCE: 30,
+    ServiceOrderType.PREVENTIVE_MAINTENANCE: 20,
+    ServiceOrderType.INSTALLATION: 12,
+    ServiceOrderType.TECHNICAL_ASSISTANCE: 10,
+    ServiceOrderType.INSPECTION: 8,
+    ServiceOrderType.PREDICTIVE_MAINTENANCE: 5,
+    ServiceOrderType.ADMINISTRATIVE: 5,
+    ServiceOrderType.BUDGET: 4,
+    ServiceOrderType.WORK_SAFETY: 3,
+    ServiceOrderType.EVENTS: 3,
+}
+STATUS_WEIGHTS = {
+    ServiceOrderStatus.COMPLETED: 50,
+    ServiceOrderStatus.OPEN: 25,
+    ServiceOrderStatus.IN_PROGRESS: 15,
+    ServiceOrderStatus.CANCELLED: 10,
+}
+PROVIDER_WEIGHTS = {
+    ServiceProviderType.TECHNICAL: 30,
+    ServiceProviderType.MAINTENANCE: 20,
+    ServiceProviderType.SPECIALIZED: 12,
+    ServiceProviderType.OPERATIONAL: 10,
+    ServiceProviderType.LOGISTICS: 6,
+    ServiceProviderType.TECHNOLOGICAL: 6,
+    ServiceProviderType.ADMINISTRATIVE: 4,
+    ServiceProviderType.CONSULTING: 3,
+    ServiceProviderType.COMMERCIAL: 3,
+    ServiceProviderType.SECURITY: 2,
+    ServiceProviderType.OTHER: 2,
+    ServiceProviderType.EDUCATIONAL: 1,
+    ServiceProviderType.COMMUNICATION: 1,
+}
+PRIORITY_WEIGHTS = {
+    ServiceOrderPriority.MEDIUM: 40,
+    ServiceOrderPriority.LOW: 30,
+    ServiceOrderPriority.HIGH: 22,
+    ServiceOrderPriority.CRITICAL: 8,
+}
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elaine', 'Fábio', 'Gabriela', 'Hugo', 'Isabela', 'João']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ferreira', 'Rocha']
+WORDS = ['bomba', 'quadro', 'elétrico', 'vazamento', 'ar-condicionado', 'portão', 'câmera', 'rede', 'telhado', 'gerador']
+
+
+def _weighted(weights):
+    return [str(value) for value in weights], list(accumulate(weights.values()))
+
+
+def build_users(count, prefix='seed', password=SEED_PASSWORD):
+    """
+    Usuários não salvos `<prefix>-<n>`, todos com a mesma senha (o hash é
+    calculado uma vez só).
+    """
+    hashed = make_password(password)
+    return [
+        User(username=f'{prefix}-{n}', email=f'{prefix}-{n}@example.com', password=hashed)
+        for n in range(count)
+    ]
+
+
+def order_rows(count, user_ids, seed=0, start=0, days=365, prefix='SEED'):
+    """
+    Gera `count` ordens como dicionários `coluna -> valor`, prontos para
+    bulk_create ou COPY. A mesma semente produz sempre os mesmos dados.
+    """
+    rng = random.Random(f'{seed}:{start}')
+    now = timezone.now()
+    span = days * 24 * 60 * 60
+
+    types, type_weights = _weighted(TYPE_WEIGHTS)
+    statuses, status_weights = _weighted(STATUS_WEIGHTS)
+    providers, provider_weights = _weighted(PROVIDER_WEIGHTS)
+    priorities, priority_weights = _weighted(PRIORITY_WEIGHTS)
+
+    # Parte dos clientes se repete, como no histórico real.
+    customers = [(cpf, make_cpf_key(cpf)) for cpf in (generate_cpf(rng) for _ in range(max(1, count // 3)))]
+
+    for n in range(start, start + count):
+        cpf, cpf_key = rng.choice(customers)
+        priority = rng.choices(priorities, cum_weights=priority_weights)[0]
+        # Mais ordens recentes que antigas.
+        created_at = now - timedelta(seconds=int(span * rng.random() ** 2))
+        due_at = sla_due_at(created_at, priority)
+
+        yield {
+            'id': uuid.UUID(int=rng.getrandbits(128), version=4),
+            'protocol': f'{prefix}-{n:09d}',
+            'so_number': f'OS-{n:09d}',
+            'type': rng.choices(types, cum_weights=type_weights)[0],
+            'status': rng.choices(statuses, cum_weights=status_weights)[0],
+            'provider': rng.choices(providers, cum_weights=provider_weights)[0],
+            'priority': priority,
+            'priority_rank': PRIORITY_RANK[priority],
+            'recipient_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'cpf': cpf,
+            'cpf_key': cpf_key,
+            'description': f'Verificar {rng.choice(WORDS)} e {rng.choice(WORDS)}.',
+            'created_by_id': rng.choice(user_ids) if user_ids else None,
+            'created_at': created_at,
+            'updated_at': min(now, created_at + timedelta(seconds=rng.randrange(0, 3 * 24 * 60 * 60))),
+            'due_at': due_at,
+            # Histórico: a faixa atual conta como já alertada, como na migração 0007.
+            'sla_alert_level': sla_level(due_at, now),
+        }
+
+
+@contextmanager
+def _explicit_timestamps():
+    # bulk_create chama pre_save, que sobrescreveria o updated_at gerado.
+    fields = [ServiceOrder._meta.get_field('updated_at')]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def bulk_create_orders(rows, batch_size=2000, using='default'):
+    created = 0
+    batch = []
+    with _explicit_timestamps():
+        for row in rows:
+            batch.append(ServiceOrder(**row))
+            if len(batch) == batch_size:
+                ServiceOrder.objects.using(using).bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            ServiceOrder.objects.using(using).bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+ORDER_COLUMNS = [
+    'id', 'protocol', 'so_number', 'type', 'status', 'provider', 'priority', 'priority_rank',
+    'recipient_name', 'cpf', 'cpf_key', 'description', 'created_by_id', 'created_at', 'updated_at',
+    'due_at', 'sla_alert_level',
+]
+
+
+def _copy(connection, sql, buffer):
+    with connection.cursor() as cursor:
+        if hasattr(cursor.cursor, 'copy_expert'):
+            cursor.cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def copy_orders(rows, batch_size=50_000, using='default'):
+    """
+    Grava as ordens com `COPY ... FROM STDIN` (PostgreSQL), em lotes de `batch_size`.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(ServiceOrder._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(column) for column in ORDER_COLUMNS)
+    sql = f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)'
+
+    created = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([row[column] for column in ORDER_COLUMNS])
+        if count % batch_size == 0:
+            buffer.seek(0)
+            _copy(connection, sql, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+        created = count
+
+    if buffer.tell():
+        buffer.seek(0)
+        _copy(connection, sql, buffer)
+    return created
+
+
+def _load_chunk(chunk):
+    start, count, user_ids, seed, days, prefix, using = chunk
+    rows = order_rows(count, user_ids, seed=seed, start=start, days=days, prefix=prefix)
+    try:
+        if connections[using].vendor == 'postgresql':
+            return copy_orders(rows, using=using)
+        return bulk_create_orders(rows, using=using)
+    finally:
+        connections[using].close()
+
+
+def load_orders(count, user_ids, seed=0, start=0, days=365, prefix='SEED', workers=1, chunk_size=100_000, using='default'):
+    """
+    Gera e grava `count` ordens em blocos de `chunk_size`. No PostgreSQL cada
+    bloco vai por COPY e, com `workers` > 1, os blocos rodam em processos
+    paralelos, cada um com sua conexão. Nos demais bancos usa bulk_create.
+    """
+    chunks = [
+        (chunk_start, min(chunk_size, start + count - chunk_start), user_ids, seed, days, prefix, using)
+        for chunk_start in range(start, start + count, chunk_size)
+    ]
+    if workers <= 1 or len(chunks) == 1 or connections[using].vendor != 'postgresql':
+        return sum(_load_chunk(chunk) for chunk in chunks)
+
+    # Os processos filhos não podem herdar conexões abertas do pai.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return sum(pool.map(_load_chunk, chunks))
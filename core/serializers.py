@@ -1,8 +1,12 @@
 import re
-from datetime import timedelta
+from collections import Counter
 from django.utils import timezone
 from rest_framework import serializers
-from .models import User, ServiceOrder, ServiceOrderType, ServiceOrderStatus, ServiceProviderType, ServiceOrderPriority
+from rest_framework.utils.field_mapping import get_unique_error_message
+from .models import (
+    User, ServiceOrder, ServiceOrderType, ServiceOrderStatus, ServiceProviderType, ServiceOrderPriority,
+    SlaAlert, SlaAlertLevel, sla_level,
+)
 from .validators import validate_cpf
 
 from django.contrib.auth.tokens import default_token_generator
@@ -79,6 +83,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Este e-mail já está em uso.')
         return value
 
+# Valores de `sla_status` na API para cada faixa de SLA.
+SLA_STATUS = {
+    SlaAlertLevel.NONE: 'on_time',
+    SlaAlertLevel.NEARING_DUE_DATE: 'nearing_due_date',
+    SlaAlertLevel.OVERDUE: 'overdue',
+}
+
 class ServiceOrderSerializer(serializers.ModelSerializer):
     created_by = serializers.StringRelatedField(read_only=True)
 
@@ -159,54 +170,94 @@ class ServiceOrderSerializer(serializers.ModelSerializer):
             return f"{obj.cpf[:3]}.***.***-{obj.cpf[-2:]}"
         return "N/A"
 
-    def _get_sla_hours(self, priority):
-        if priority == 'high':
-            return 24
-        elif priority == 'medium':
-            return 48
-        else:
-            return 72
-
     def get_due_date(self, obj):
-        if not obj.created_at:
-            return None
-
-        hours = self._get_sla_hours(obj.priority)
-        return obj.created_at + timedelta(hours=hours)
+        return obj.due_at
 
     def get_time_remaining_seconds(self, obj):
-        due_date = self.get_due_date(obj)
-        if not due_date:
+        if not obj.due_at:
             return None
 
         if obj.status == 'completed' or obj.status == 'concluida':
              return 0
 
         now = timezone.now()
-        remaining = due_date - now
+        remaining = obj.due_at - now
         return int(remaining.total_seconds())
 
     def get_sla_status(self, obj):
         if obj.status == 'completed' or obj.status == 'concluida':
              return 'on_time'
 
-        time_remaining = self.get_time_remaining_seconds(obj)
-        if time_remaining is None:
+        if not obj.due_at:
             return "N/A"
 
-        if time_remaining < 0:
-            return "overdue"
-
-        if time_remaining < (4 * 60 * 60):
-            return "nearing_due_date"
-
-        return "on_time"
+        return SLA_STATUS[sla_level(obj.due_at, timezone.now())]
 
     def create(self, validated_data):
         user = self.context['request'].user
         validated_data['created_by'] = user
         return super().create(validated_data)
 
+class SlaAlertSerializer(serializers.ModelSerializer):
+    order = serializers.UUIDField(source='order_id', read_only=True)
+    protocol = serializers.CharField(source='order.protocol', read_only=True)
+    sla_status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SlaAlert
+        fields = ['id', 'order', 'protocol', 'sla_status', 'due_at', 'created_at']
+
+    def get_sla_status(self, obj):
+        return SLA_STATUS[obj.level]
+
+class ServiceOrderImportListSerializer(serializers.ListSerializer):
+    """
+    Verifica a unicidade dos protocolos do arquivo com uma única consulta, em
+    vez de um UniqueValidator (uma consulta) por linha.
+    """
+
+    def to_internal_value(self, data):
+        rows = super().to_internal_value(data)
+
+        protocols = [row['protocol'] for row in rows]
+        existing = set(ServiceOrder.objects.filter(protocol__in=protocols).values_list('protocol', flat=True))
+        counts = Counter(protocols)
+
+        message = get_unique_error_message(ServiceOrder._meta.get_field('protocol'))
+        errors = [
+            {'protocol': [message]} if protocol in existing or counts[protocol] > 1 else {}
+            for protocol in protocols
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+class ServiceOrderImportSerializer(ServiceOrderSerializer):
+    class Meta(ServiceOrderSerializer.Meta):
+        list_serializer_class = ServiceOrderImportListSerializer
+        extra_kwargs = {
+            **ServiceOrderSerializer.Meta.extra_kwargs,
+            'protocol': {'validators': []},
+        }
+
+class ServiceOrderBulkSerializer(serializers.Serializer):
+    UPDATE = 'update'
+    DELETE = 'delete'
+    UPDATE_FIELDS = ['status', 'priority', 'provider']
+    MAX_IDS = 1000
+
+    action = serializers.ChoiceField(choices=[UPDATE, DELETE])
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=MAX_IDS)
+
+    status = serializers.ChoiceField(choices=ServiceOrderStatus.choices, required=False)
+    priority = serializers.ChoiceField(choices=ServiceOrderPriority.choices, required=False)
+    provider = serializers.ChoiceField(choices=ServiceProviderType.choices, required=False)
+
+    def validate(self, attrs):
+        if attrs['action'] == self.UPDATE and not any(field in attrs for field in self.UPDATE_FIELDS):
+            raise serializers.ValidationError('Informe ao menos um campo para atualizar: status, priority ou provider.')
+        return attrs
+
 class PasswordResetConfirmSerializer(serializers.Serializer):
     uid = serializers.CharField(write_only=True)
     token = serializers.CharField(write_only=True)
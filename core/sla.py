@@ -0,0 +1,57 @@
+"""
+Varredura de SLA: registra em SlaAlert as ordens que ficaram próximas do
+vencimento ou vencidas desde a execução anterior.
+
+As duas consultas percorrem o índice parcial so_sla_pending_idx por faixa de
+`due_at`, então o custo acompanha o número de transições, não o tamanho da tabela.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import SLA_WARNING, ServiceOrder, SlaAlert, SlaAlertLevel
+
+
+def _record(candidates, level, batch_size):
+    recorded = 0
+    while True:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            # skip_locked: vários processos de scan_sla não alertam a mesma ordem duas vezes.
+            batch = list(
+                candidates.select_for_update(skip_locked=True)
+                .order_by('due_at')
+                .values_list('pk', 'due_at')[:batch_size]
+            )
+            if not batch:
+                return recorded
+
+            SlaAlert.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+                SlaAlert(order_id=pk, level=level, due_at=due_at) for pk, due_at in batch
+            ])
+            ServiceOrder.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=[pk for pk, due_at in batch]).update(sla_alert_level=level)
+
+        recorded += len(batch)
+        if len(batch) < batch_size:
+            return recorded
+
+
+def scan_sla(now=None, batch_size=1000):
+    """
+    Retorna quantas ordens passaram a "vencida" e a "próxima do vencimento".
+    """
+    now = now or timezone.now()
+    # SELECT ... FOR UPDATE precisa da transação: sem isso o ReplicaRouter mandaria a leitura a uma réplica.
+    pending = ServiceOrder.objects.using(DEFAULT_DB_ALIAS).sla_pending()
+
+    # Vencidas primeiro: uma ordem que pulou direto para vencida não gera os dois alertas.
+    # O IN (em vez de só `< OVERDUE`) deixa o banco buscar uma faixa de due_at por nível.
+    overdue = _record(
+        pending.filter(sla_alert_level__in=[SlaAlertLevel.NONE, SlaAlertLevel.NEARING_DUE_DATE], due_at__lt=now),
+        SlaAlertLevel.OVERDUE,
+        batch_size,
+    )
+    nearing = _record(
+        pending.filter(sla_alert_level=SlaAlertLevel.NONE, due_at__gte=now, due_at__lt=now + SLA_WARNING),
+        SlaAlertLevel.NEARING_DUE_DATE,
+        batch_size,
+    )
+    return overdue, nearing
@@ -0,0 +1,176 @@
+"""
+Snapshot colunar (Parquet) das ordens de serviço para análises fora do banco
+transacional.
+
+Cada exportação grava só as ordens alteradas desde a anterior (marca d'água em
+`updated_at`, `id`), particionadas por mês de criação:
+
+    <dir>/created_month=2026-10/part-20261019T120000.parquet
+
+Uma ordem alterada aparece de novo na exportação seguinte; quem lê deve ficar
+com a linha de maior `updated_at` de cada `id`. CPF, nome do cliente e
+descrição não são exportados; `cpf_key` identifica o cliente.
+"""
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ServiceOrder
+
+# pyarrow (com numpy) custa ~120 ms na partida e só a exportação o usa: importado no primeiro uso.
+HAS_PYARROW = find_spec('pyarrow') is not None
+pa = pq = None
+
+MANIFEST_NAME = '_manifest.json'
+EXPORT_LAG = timedelta(minutes=1)
+
+COLUMNS = [
+    'id', 'protocol', 'so_number', 'type', 'status', 'provider', 'priority', 'priority_rank',
+    'cpf_key', 'created_by_id', 'created_at', 'updated_at',
+]
+_ID, _CREATED_AT, _UPDATED_AT = (COLUMNS.index(name) for name in ('id', 'created_at', 'updated_at'))
+
+
+def _load_pyarrow():
+    global pa, pq
+    if pa is None:
+        import pyarrow
+        import pyarrow.parquet
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def _schema():
+    # Colunas de choices têm poucos valores distintos: gravadas como dicionário.
+    enum = pa.dictionary(pa.int8(), pa.string())
+    timestamp = pa.timestamp('us', tz='UTC')
+    return pa.schema([
+        ('id', pa.string()),
+        ('protocol', pa.string()),
+        ('so_number', pa.string()),
+        ('type', enum),
+        ('status', enum),
+        ('provider', enum),
+        ('priority', enum),
+        ('priority_rank', pa.int8()),
+        ('cpf_key', pa.string()),
+        ('created_by_id', pa.string()),
+        ('created_at', timestamp),
+        ('updated_at', timestamp),
+    ])
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'watermark': None, 'files': []}
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+
+def _changed_orders(watermark, until):
+    queryset = ServiceOrder.objects.filter(updated_at__lte=until).order_by('updated_at', 'id')
+    if watermark:
+        updated_at = datetime.fromisoformat(watermark['updated_at'])
+        queryset = queryset.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=watermark['id'])
+        )
+    return queryset.values_list(*COLUMNS)
+
+
+def _to_table(rows, schema):
+    columns = list(zip(*rows))
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name in ('id', 'created_by_id'):
+            values = [str(value) if value is not None else None for value in values]
+        arrays.append(pa.array(values, field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def export_snapshot(directory, full=False, batch_size=50_000, lag=EXPORT_LAG):
+    """
+    Exporta as ordens alteradas desde a última execução (ou todas, com `full`).
+
+    A leitura usa `iterator()`, que no PostgreSQL abre um cursor no servidor.
+    Ordens alteradas há menos de `lag` ficam para a próxima execução, para não
+    perder transações ainda abertas com `updated_at` anterior à marca d'água.
+    Retorna a quantidade de linhas e os arquivos gravados.
+    """
+    if not HAS_PYARROW:
+        raise ImportError('O snapshot analítico exige o pacote pyarrow.')
+    _load_pyarrow()
+
+    os.makedirs(directory, exist_ok=True)
+    previous = read_manifest(directory)
+    manifest = {'watermark': None, 'files': []} if full else previous
+    run_id = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    schema = _schema()
+
+    writers = {}
+    files = defaultdict(lambda: {'rows': 0})
+    batches = defaultdict(list)
+    last = None
+    total = 0
+
+    def flush(month):
+        rows = batches.pop(month)
+        if month not in writers:
+            relative = os.path.join(f'created_month={month}', f'part-{run_id}.parquet')
+            os.makedirs(os.path.join(directory, os.path.dirname(relative)), exist_ok=True)
+            writers[month] = (relative, pq.ParquetWriter(
+                os.path.join(directory, relative), schema, compression='zstd', use_dictionary=True
+            ))
+        relative, writer = writers[month]
+        writer.write_table(_to_table(rows, schema))
+        files[relative]['rows'] += len(rows)
+
+    try:
+        changed = _changed_orders(manifest['watermark'], timezone.now() - lag)
+        for row in changed.iterator(chunk_size=batch_size):
+            month = f'{row[_CREATED_AT]:%Y-%m}'
+            batches[month].append(row)
+            if len(batches[month]) >= batch_size:
+                flush(month)
+            last = row
+            total += 1
+
+        for month in list(batches):
+            flush(month)
+    finally:
+        for relative, writer in writers.values():
+            writer.close()
+
+    written = []
+    for relative, info in sorted(files.items()):
+        info.update(path=relative, bytes=os.path.getsize(os.path.join(directory, relative)), run=run_id)
+        written.append(info)
+
+    if last is not None:
+        manifest['watermark'] = {'updated_at': last[_UPDATED_AT].isoformat(), 'id': str(last[_ID])}
+    manifest['files'] = manifest['files'] + written
+    manifest['exported_at'] = timezone.now().isoformat()
+    _write_manifest(directory, manifest)
+
+    if full:
+        # Uma exportação completa substitui os arquivos anteriores.
+        current = {info['path'] for info in written}
+        for info in previous['files']:
+            if info['path'] in current:
+                continue
+            try:
+                os.remove(os.path.join(directory, info['path']))
+            except FileNotFoundError:
+                pass
+    return total, written
@@ -1,10 +1,47 @@
+import gzip
 import io
-from datetime import timedelta
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.mail import EmailMessage
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.http import HttpResponse, QueryDict
+from django.core.management import CommandError, call_command
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
 from django.utils import timezone
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
-from .models import User, ServiceOrder as OrdemServico
+from rest_framework_simplejwt.tokens import AccessToken
+from . import async_views, metrics, snapshots, views, warmup
+from .db_routers import ReplicaRouter, pin_to_primary, unpin
+from .email_backends import DirectMXEmailBackend
+from .filters import ServiceOrderFilter, ServiceOrderOrderingFilter
+from .management.commands.partition_orders import month_ranges, partition_name
+from .middleware import MetricsMiddleware, QueryInspectionError
+from .models import User, ServiceOrder as OrdemServico, ServiceOrderEvent, ServiceOrderPriority, ServiceOrderStatus, SlaAlert
+from .parsers import expand
+from .renderers import FastJSONRenderer, compact, msgpack
+from .seeding import build_users, bulk_create_orders, order_rows
+from .sla import scan_sla
+from .throttling import acquire_slot, release_slot
+from .validators import CPF_INVALID_CHECK_DIGITS, CPF_INVALID_LENGTH, CPF_REPEATED_DIGITS, make_cpf_key, validate_cpf_batch
+
+# Falha o teste quando uma requisição repete a mesma consulta (N+1) ou demora demais.
+inspect_queries = override_settings(
+    QUERY_INSPECTOR=True,
+    QUERY_INSPECTOR_RAISE=True,
+    QUERY_INSPECTOR_REPEAT_THRESHOLD=2,
+    QUERY_INSPECTOR_SLOW_MS=1000,
+)
 
 class AuthTests(APITestCase):
     def setUp(self):
@@ -48,6 +85,18 @@ class AuthTests(APITestCase):
         self.assertEqual(response.data['username'], user.username)
         self.assertEqual(response.data['email'], user.email)
 
+    def test_database_pool_stats_admin_only(self):
+        user = User.objects.create_user(**self.user_data)
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(reverse('db-pool-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse('db-pool-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('conn_max_age', response.data)
+        self.assertIn('pool', response.data)
+
     def test_patch_user_profile(self):
         user = User.objects.create_user(**self.user_data)
         self.client.force_authenticate(user=user)
@@ -65,6 +114,265 @@ class AuthTests(APITestCase):
         self.assertEqual(user.last_name, 'User Updated')
 
 
+class MetricsTests(APITestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username='metrics', password='123', email='metrics@example.com')
+        self.client.force_authenticate(user=self.user)
+
+    def test_records_queries_and_server_timing(self):
+        response = self.client.get(reverse('ordem-list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=')
+
+        response = self.client.get(reverse('metrics'))
+        body = response.content.decode()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('db_queries_per_request_count{view="ordem-list",method="GET"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="ordem-list",method="GET",status="200",le="+Inf"} 1', body)
+        self.assertIn('render_duration_seconds_count{view="ordem-list",method="GET"} 1', body)
+
+    async def test_counts_queries_of_async_views(self):
+        # O ORM assíncrono roda as consultas numa thread do executor, não na do event loop.
+        async def view(request):
+            await User.objects.acount()
+            return HttpResponse()
+
+        response = await MetricsMiddleware(view)(AsyncRequestFactory().get('/'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries"')
+
+    @override_settings(METRICS_TOKEN='segredo')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer segredo'})
+        self.assertEqual(response.status_code, 200)
+
+
+class ReadinessTests(TestCase):
+
+    def setUp(self):
+        warmup._state.update(warm=False, duration_ms=None, steps={}, errors={})
+        self.addCleanup(warmup._state.update, warm=False, duration_ms=None, steps={}, errors={})
+
+    def test_ready_after_warm_up(self):
+        response = self.client.get(reverse('readiness'))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'ready')
+        self.assertEqual(set(data['steps']), {name for name, step in warmup.STEPS})
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+    def test_not_ready_until_every_step_succeeds(self):
+        def database():
+            raise OperationalError('sem banco')
+
+        steps = [(name, database if name == 'database' else step) for name, step in warmup.STEPS]
+        with mock.patch.object(warmup, 'STEPS', steps), self.assertLogs('core.warmup', 'ERROR'):
+            response = self.client.get(reverse('readiness'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'warming_up')
+        self.assertEqual(response.json()['errors'], {'database': 'OperationalError'})
+
+        # A próxima verificação tenta de novo.
+        self.assertEqual(self.client.get(reverse('readiness')).status_code, 200)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_replica_down_does_not_block_readiness(self):
+        with mock.patch.object(warmup, 'replica_is_healthy', return_value=False) as healthy:
+            response = self.client.get(reverse('readiness'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['replicas'], {'replica1': False})
+        healthy.assert_called_with('replica1')
+
+
+class CompressionTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='gzip', password='123', email='gzip@example.com', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        User.objects.bulk_create(build_users(30, prefix='zip'))
+
+    def test_large_responses_are_compressed_when_accepted(self):
+        response = self.client.get(reverse('user-list'), {'page_size': 30}, headers={'Accept-Encoding': 'br;q=0.5, gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['results']), 30)
+
+        response = self.client.get(reverse('user-list'), {'page_size': 30}, headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        # Abaixo de COMPRESSION_MIN_SIZE a resposta sai como está.
+        response = self.client.get(reverse('hello-world'), headers={'Accept-Encoding': 'gzip'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_responses_are_compressed_per_chunk(self):
+        response = self.client.get(reverse('presentation-list'), {'page_size': 30}, headers={'Accept-Encoding': 'gzip'})
+        chunks = list(response.streaming_content)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertGreater(len(chunks), 2)
+        html = gzip.decompress(b''.join(chunks)).decode()
+        self.assertIn('zip-29', html)
+
+    def test_fast_renderer_matches_drf_output(self):
+        data = {'id': self.user.pk, 'joined': self.user.date_joined, 'label': 'Aberta\u2028', 1: 'x'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class MessagePackTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='msgpack', password='123', email='msgpack@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.order = OrdemServico.objects.create(
+            created_by=self.user,
+            protocol="PROT-M1",
+            so_number="OS-M1",
+            recipient_name="Cliente",
+            description="Descrição",
+            priority="critical",
+            cpf="401.853.320-99"
+        )
+
+    def test_compact_uuids_and_choices_round_trip(self):
+        data = {
+            'count': 1,
+            'results': [{'id': str(self.order.pk), 'status': 'completed', 'priority': 'critical', 'protocol': 'open'}],
+            'ids': [str(self.order.pk)],
+        }
+        packed = compact(data)
+
+        self.assertEqual(packed['results'][0]['id'], self.order.pk.bytes)
+        self.assertEqual(packed['ids'], [self.order.pk.bytes])
+        self.assertEqual(packed['results'][0]['status'], ServiceOrderStatus.values.index('completed'))
+        # Só os campos de choices conhecidos viram código.
+        self.assertEqual(packed['results'][0]['protocol'], 'open')
+        self.assertEqual(expand(packed), data)
+
+    @skipUnless(msgpack, 'msgpack não instalado')
+    def test_list_and_import_speak_msgpack(self):
+        response = self.client.get(reverse('ordem-list'), headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data['results'][0]['id'], self.order.pk.bytes)
+        self.assertEqual(expand(data)['results'][0]['priority'], 'critical')
+
+        rows = [{
+            'protocol': 'PROT-M2', 'so_number': 'OS-M2', 'type': 0, 'status': 0, 'provider': 0,
+            'priority': 3, 'recipient_name': 'Cliente', 'cpf': '275.389.476-04', 'description': 'Importada',
+        }]
+        response = self.client.post(
+            reverse('ordem-import-csv'), msgpack.packb(rows), content_type='application/msgpack',
+            headers={'Accept': 'application/msgpack'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(OrdemServico.objects.get(protocol='PROT-M2').priority, ServiceOrderPriority.values[3])
+
+
+@override_settings(
+    RATE_LIMIT_CACHE='default',
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {'login': '2/min', 'search': '1/min'},
+    },
+)
+class RateLimitTests(APITestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='limite', password='Senha123!', email='limite@example.com')
+        self.lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.lock_dir)
+
+    def test_login_bucket_allows_burst_then_429(self):
+        credentials = {'username': 'limite', 'password': 'Senha123!'}
+        for _ in range(2):
+            response = self.client.post(reverse('token_obtain_pair'), credentials, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(reverse('token_obtain_pair'), credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertLessEqual(int(response['Retry-After']), 30)
+
+        with override_settings(RATE_LIMITING=False):
+            response = self.client.post(reverse('token_obtain_pair'), credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_only_expensive_searches_are_limited(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('ordem-list')
+
+        self.assertEqual(self.client.get(url, {'search': 'a'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url, {'search': 'b'}).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url, {'page_size': 100}).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url, {'page_size': 10}).status_code, status.HTTP_200_OK)
+
+    def test_import_sheds_load_when_slots_are_taken(self):
+        self.client.force_authenticate(user=self.user)
+        with override_settings(CONCURRENCY_LIMITS={'import': 1}, CONCURRENCY_LOCK_DIR=self.lock_dir):
+            slot = acquire_slot('import')
+            try:
+                response = self.client.post(reverse('ordem-import-csv'), [], format='json')
+            finally:
+                release_slot(slot)
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '1')
+
+            # Com a vaga livre a requisição passa (e falha só na validação).
+            response = self.client.post(reverse('ordem-import-csv'), [], format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserDirectoryTests(APITestCase):
+
+    def setUp(self):
+        base = timezone.now()
+        self.users = [
+            User.objects.create_user(
+                username=f'pessoa{i}',
+                email=f'pessoa{i}@example.com',
+                password='123',
+                date_joined=base - timedelta(minutes=i // 2)
+            )
+            for i in range(7)
+        ]
+        self.client.force_authenticate(user=self.users[0])
+
+    def test_keyset_pages_cover_all_users_once(self):
+        expected = list(User.objects.order_by('-date_joined', '-id').values_list('username', flat=True))
+
+        seen = []
+        url = reverse('user-list') + '?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen += [user['username'] for user in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_prefix_search(self):
+        response = self.client.get(reverse('user-list') + '?search=pessoa3')
+        self.assertEqual([user['username'] for user in response.data['results']], ['pessoa3'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('user-list') + '?cursor=invalido')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_presentation_list_is_streamed_and_paginated(self):
+        response = self.client.get(reverse('presentation-list') + '?page_size=5')
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.count('class="btn-delete"'), 5)
+        self.assertIn('Próxima página', content)
+
+
+@inspect_queries
 class OrdemServicoTests(APITestCase):
 
     def setUp(self):
@@ -197,6 +505,308 @@ class OrdemServicoTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(OrdemServico.objects.count(), 1)
 
+    def test_filter_by_cpf_ignores_formatting(self):
+        self.assertEqual(len(self.os1.cpf_key), 64)
+
+        response = self.client.get(self.list_url + '?cpf=40185332099')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['protocol'], 'PROT-001')
+
+    def test_filter_by_invalid_cpf_returns_nothing(self):
+        OrdemServico.objects.filter(pk=self.os2.pk).update(cpf_key=None)
+
+        self.assertFalse(OrdemServico.objects.for_cpf('123').exists())
+        response = self.client.get(self.list_url + '?cpf=123')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_backfill_cpf_key(self):
+        OrdemServico.objects.update(cpf_key=None)
+
+        call_command('backfill_cpf_key', stdout=io.StringIO())
+
+        self.assertEqual(OrdemServico.objects.for_cpf('275.389.476-04').get(), self.os2)
+
+    def test_filter_by_created_at_range(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get(self.list_url, {'created_at__gte': since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([o['protocol'] for o in response.data['results']], ['PROT-001'])
+
+    def test_filter_by_status_in_and_updated_at(self):
+        response = self.client.get(self.list_url, {'status__in': 'open,completed', 'priority__in': 'low'})
+        self.assertEqual([o['protocol'] for o in response.data['results']], ['PROT-002'])
+
+        since = (timezone.now() + timedelta(minutes=1)).isoformat()
+        response = self.client.get(self.list_url, {'updated_at__gte': since})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_ordering_by_priority_is_semantic(self):
+        OrdemServico.objects.create(
+            created_by=self.user,
+            protocol="PROT-003",
+            so_number="OS-003",
+            recipient_name="Cliente Teste 3",
+            description="Descrição teste 3",
+            priority="medium",
+            cpf="243.458.203-67"
+        )
+        self.assertEqual(self.os1.priority_rank, 3)
+
+        response = self.client.get(self.list_url, {'ordering': '-priority'})
+        self.assertEqual([o['priority'] for o in response.data['results']], ['high', 'medium', 'low'])
+
+        response = self.client.get(self.list_url, {'ordering': 'priority'})
+        self.assertEqual([o['priority'] for o in response.data['results']], ['low', 'medium', 'high'])
+
+    def test_query_inspector_flags_n_plus_one(self):
+        with mock.patch.object(views.OrdemServicoList, 'queryset', OrdemServico.objects.all()):
+            with self.assertRaisesMessage(QueryInspectionError, 'ServiceOrderSerializer.created_by'):
+                self.client.get(self.list_url)
+
+
+class OrdemServicoBulkTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='123', email='bulkuser@example.com')
+        self.other = User.objects.create_user(username='other', password='123', email='bulkother@example.com')
+        self.bulk_url = reverse('ordem-bulk')
+
+        self.orders = [
+            OrdemServico.objects.create(
+                created_by=self.user,
+                protocol=f"PROT-B{i}",
+                so_number=f"OS-B{i}",
+                recipient_name="Cliente",
+                description="Descrição",
+                cpf="401.853.320-99"
+            )
+            for i in range(3)
+        ]
+        self.foreign = OrdemServico.objects.create(
+            created_by=self.other,
+            protocol="PROT-B9",
+            so_number="OS-B9",
+            recipient_name="Outro",
+            description="Descrição",
+            cpf="275.389.476-04"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_update_scoped_to_own_orders(self):
+        before = self.orders[0].updated_at
+        ids = [str(order.pk) for order in self.orders] + [str(self.foreign.pk)]
+
+        response = self.client.post(self.bulk_url, {
+            'action': 'update',
+            'ids': ids,
+            'status': 'completed',
+            'priority': 'critical'
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['processed'], 3)
+        self.assertEqual([r['result'] for r in response.data['results']], ['updated'] * 3 + ['not_found'])
+
+        self.orders[0].refresh_from_db()
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.orders[0].status, 'completed')
+        self.assertEqual(self.orders[0].priority, 'critical')
+        self.assertEqual(self.orders[0].priority_rank, 4)
+        self.assertGreater(self.orders[0].updated_at, before)
+        self.assertEqual(self.foreign.status, 'open')
+
+    def test_bulk_delete(self):
+        response = self.client.post(self.bulk_url, {
+            'action': 'delete',
+            'ids': [str(self.orders[0].pk), str(self.orders[1].pk)]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(OrdemServico.objects.count(), 2)
+
+    def test_bulk_update_requires_a_field(self):
+        response = self.client.post(self.bulk_url, {
+            'action': 'update',
+            'ids': [str(self.orders[0].pk)]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ServiceOrderFilterIndexTests(TestCase):
+    """Cada combinação de filtros suportada precisa ser resolvida por índice."""
+
+    cases = [
+        ('created_at__gte=2026-01-01T00:00:00Z&created_at__lt=2026-02-01T00:00:00Z', 'so_created_idx'),
+        ('updated_at__gte=2026-01-01T00:00:00Z&updated_at__lt=2026-01-02T00:00:00Z', 'so_updated_idx'),
+        ('status__in=open,in_progress&created_at__gte=2026-01-01T00:00:00Z', 'so_status_created_idx'),
+        ('status=open&created_at__lt=2026-01-01T00:00:00Z', 'so_status_created_idx'),
+        ('priority__in=high,critical&created_at__gte=2026-01-01T00:00:00Z', 'so_priority_created_idx'),
+    ]
+
+    def explain(self, query):
+        filterset = ServiceOrderFilter(QueryDict(query), queryset=OrdemServico.objects.all())
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Com tabelas pequenas o planner prefere Seq Scan; aqui só importa se o índice serve.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return filterset.qs.explain()
+
+    def test_filters_use_indexes(self):
+        for query, index in self.cases:
+            with self.subTest(query=query):
+                plan = self.explain(query)
+                if connection.vendor == 'postgresql':
+                    self.assertNotIn('Seq Scan', plan)
+                else:
+                    self.assertIn(f'SEARCH core_serviceorder USING INDEX {index}', plan)
+
+    def test_priority_ordering_uses_index_without_sort(self):
+        request = Request(APIRequestFactory().get('/', {'ordering': '-priority'}))
+        queryset = ServiceOrderOrderingFilter().filter_queryset(
+            request, OrdemServico.objects.all(), views.OrdemServicoList()
+        )
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('SET LOCAL enable_sort = off')
+                self.assertNotIn('Sort', queryset.explain())
+            else:
+                plan = queryset.explain()
+                self.assertIn('so_priority_rank_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SlaScanTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sla', password='123', email='sla@example.com')
+        self.other = User.objects.create_user(username='sla2', password='123', email='sla2@example.com')
+        now = timezone.now()
+
+        def order(n, hours_ago, priority='high', status='open', created_by=None):
+            return OrdemServico.objects.create(
+                created_by=created_by or self.user,
+                protocol=f"PROT-S{n}",
+                so_number=f"OS-S{n}",
+                recipient_name="Cliente",
+                description="Descrição",
+                priority=priority,
+                status=status,
+                cpf="401.853.320-99",
+                created_at=now - timedelta(hours=hours_ago),
+            )
+
+        # Prazo de 24h para prioridade alta.
+        self.on_time = order(1, 1)
+        self.nearing = order(2, 22)
+        self.overdue = order(3, 30)
+        self.completed = order(4, 30, status='completed')
+        self.foreign = order(5, 30, created_by=self.other)
+
+    def test_scan_records_each_transition_once(self):
+        self.assertEqual(self.nearing.due_at, self.nearing.created_at + timedelta(hours=24))
+        self.assertEqual(scan_sla(), (2, 1))
+        self.assertEqual(scan_sla(), (0, 0))
+
+        levels = dict(SlaAlert.objects.values_list('order__protocol', 'level'))
+        self.assertEqual(levels, {'PROT-S2': 1, 'PROT-S3': 2, 'PROT-S5': 2})
+
+        # A ordem próxima do vencimento gera um segundo alerta quando vence.
+        self.assertEqual(scan_sla(now=timezone.now() + timedelta(hours=3)), (1, 0))
+
+        # Mudar a prioridade recalcula o prazo e reinicia a faixa alertada.
+        self.overdue.priority = 'low'
+        self.overdue.save()
+        self.assertEqual(self.overdue.sla_alert_level, 0)
+        self.assertEqual(scan_sla(), (0, 0))
+
+    @override_settings(DATABASE_ROUTERS=['core.db_routers.ReplicaRouter'], DATABASE_REPLICAS=['replica1'])
+    def test_scan_runs_on_primary_with_replicas(self):
+        token = pin_to_primary(False)
+        try:
+            with mock.patch('core.db_routers.replica_is_healthy', return_value=True):
+                self.assertEqual(scan_sla(), (2, 1))
+        finally:
+            unpin(token)
+
+    def test_scanner_loop_survives_a_failed_scan(self):
+        out = io.StringIO()
+        with mock.patch('core.management.commands.scan_sla.scan_sla', side_effect=[OperationalError('banco fora'), (1, 0)]), \
+                mock.patch('core.management.commands.scan_sla.time.sleep', side_effect=[None, KeyboardInterrupt]), \
+                self.assertLogs('core.management.commands.scan_sla', 'ERROR'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('scan_sla', stdout=out)
+        self.assertIn('1 ordens vencidas', out.getvalue())
+
+    def test_bulk_update_keeps_alert_level_of_unchanged_priority(self):
+        scan_sla()
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(reverse('ordem-bulk'), {
+            'action': 'update',
+            'ids': [str(self.overdue.pk), str(self.on_time.pk)],
+            'priority': 'high',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.overdue.refresh_from_db()
+        self.assertEqual(self.overdue.sla_alert_level, 2)
+        self.assertEqual(scan_sla(), (0, 0))
+        self.assertEqual(SlaAlert.objects.filter(order=self.overdue).count(), 1)
+
+        # Quem muda de prioridade volta a ser acompanhado com o prazo novo.
+        response = self.client.post(reverse('ordem-bulk'), {
+            'action': 'update',
+            'ids': [str(self.overdue.pk)],
+            'priority': 'low',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.overdue.refresh_from_db()
+        self.assertEqual(self.overdue.sla_alert_level, 0)
+        self.assertEqual(self.overdue.due_at, self.overdue.created_at + timedelta(hours=72))
+
+    def test_scan_uses_partial_index(self):
+        now = timezone.now()
+        pending = OrdemServico.objects.sla_pending()
+        for queryset in (pending.filter(sla_alert_level__in=[0, 1], due_at__lt=now), pending.filter(sla_alert_level=0, due_at__gte=now)):
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    # Com poucas linhas o planejador preferiria ler a tabela inteira.
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+                    self.assertIn('so_sla_pending_idx', queryset.order_by('due_at').explain())
+                else:
+                    plan = queryset.order_by('due_at').explain()
+                    self.assertIn('USING INDEX so_sla_pending_idx (sla_alert_level=? AND due_at', plan)
+
+    def test_alert_list_is_scoped_and_incremental(self):
+        scan_sla()
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(reverse('sla-alert-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(alert['protocol'], alert['sla_status']) for alert in response.data['results']],
+            [('PROT-S2', 'nearing_due_date'), ('PROT-S3', 'overdue')],
+        )
+
+        newest = response.data['results'][0]['id']
+        response = self.client.get(reverse('sla-alert-list'), {'after': newest})
+        self.assertEqual(response.data['count'], 0)
+
+        detail = self.client.get(reverse('ordem-detail', kwargs={'pk': self.overdue.pk}))
+        self.assertEqual(detail.data['sla_status'], 'overdue')
+        self.assertEqual(detail.data['due_date'], self.overdue.due_at)
+
+
+@inspect_queries
 class CSVImportTests(APITestCase):
 
     def setUp(self):
@@ -235,9 +845,34 @@ class CSVImportTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['message'], "Importado com sucesso 2 ordens de serviço.")
+        self.assertEqual(response.data['existing_customers'], 0)
         self.assertEqual(OrdemServico.objects.count(), 2)
         self.assertEqual(OrdemServico.objects.first().created_by, self.admin)
 
+    def test_customer_counts_ignore_rows_without_cpf_key(self):
+        key = make_cpf_key('275.351.678-29')
+        blank_rows = [make_cpf_key(''), make_cpf_key('')]
+        self.assertEqual(views.customer_counts(blank_rows, set()), {
+            'existing_customers': 0, 'duplicate_customers_in_file': 0,
+        })
+        self.assertEqual(views.customer_counts(blank_rows + [key, key], {key}), {
+            'existing_customers': 2, 'duplicate_customers_in_file': 1,
+        })
+
+    def test_csv_import_rejects_repeated_protocols(self):
+        self.client.force_authenticate(user=self.admin)
+        OrdemServico.objects.create(
+            protocol="PROT-100", so_number="OS-100", recipient_name="Antigo", description="Desc"
+        )
+
+        csv_file = io.StringIO(self.csv_content + "PROT-101,OS-102,installation,open,CSV 3,243.458.203-67,technical,low,Desc 3\n")
+        csv_file.name = "test.csv"
+        response = self.client.post(self.import_url, {"file": csv_file}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([sorted(row) for row in response.data["errors"]], [["protocol"], ["protocol"], ["protocol"]])
+        self.assertEqual(OrdemServico.objects.count(), 1)
+
     def test_csv_import_invalid_data(self):
         self.client.force_authenticate(user=self.admin)
 
@@ -275,3 +910,448 @@ class CSVImportTests(APITestCase):
             str(error_entry["priority"][0]),
             '"prioridade_invalida" is not a valid choice.'
         )
+
+
+class IdempotencyTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='retry', password='123', email='retry@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.data = {
+            "protocol": "PROT-I1",
+            "so_number": "OS-I1",
+            "type": "installation",
+            "status": "open",
+            "provider": "technical",
+            "priority": "medium",
+            "recipient_name": "Cliente",
+            "cpf": "243.458.203-67",
+            "description": "Instalar",
+        }
+
+    def post(self, data, key='chave-1'):
+        return self.client.post(reverse('ordem-list'), data, format='json', headers={'Idempotency-Key': key})
+
+    def test_retry_replays_created_order(self):
+        first = self.post(self.data)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with self.assertNumQueries(1):
+            retry = self.post(self.data)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['id'], str(first.data['id']))
+        self.assertEqual(OrdemServico.objects.count(), 1)
+
+        response = self.post({**self.data, 'description': 'Outra'})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_errors_are_not_stored(self):
+        response = self.post({**self.data, 'cpf': '111.111.111-11'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.post(self.data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_same_csv_is_not_imported_twice(self):
+        content = (
+            "protocol,so_number,type,status,recipient_name,cpf,provider,priority,description\n"
+            "PROT-I2,OS-I2,administrative,open,CSV 1,275.351.678-29,technical,low,Desc 1\n"
+        )
+        responses = []
+        for _ in range(2):
+            csv_file = io.StringIO(content)
+            csv_file.name = 'retry.csv'
+            with mock.patch.object(views, 'ServiceOrderImportSerializer', wraps=views.ServiceOrderImportSerializer) as serializer:
+                responses.append(self.client.post(reverse('ordem-import-csv'), {'file': csv_file}, format='multipart'))
+
+        self.assertEqual([response.status_code for response in responses], [201, 409])
+        self.assertEqual(responses[1].data['detail'].code, 'duplicate_content')
+        self.assertNotIn('Idempotent-Replayed', responses[1])
+        serializer.assert_not_called()
+        self.assertEqual(OrdemServico.objects.filter(protocol='PROT-I2').count(), 1)
+
+        # Com as ordens apagadas, uma Idempotency-Key nova importa o arquivo de novo.
+        OrdemServico.objects.filter(protocol='PROT-I2').delete()
+        csv_file = io.StringIO(content)
+        csv_file.name = 'retry.csv'
+        response = self.client.post(
+            reverse('ordem-import-csv'), {'file': csv_file}, format='multipart', headers={'Idempotency-Key': 'nova'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(OrdemServico.objects.filter(protocol='PROT-I2').count(), 1)
+
+
+class DirectMXEmailBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        self.messages = [
+            EmailMessage('Assunto', 'Corpo', 'nao-responda@sigos.com.br', [f'user{i}@dominio{i % 3}.com'])
+            for i in range(9)
+        ]
+
+    def send(self, messages=None, refused=None, **kwargs):
+        backend = DirectMXEmailBackend(**kwargs)
+        with mock.patch.object(DirectMXEmailBackend, '_resolve_mx', return_value='mx.local'), \
+                mock.patch('core.email_backends.smtplib.SMTP') as smtp:
+            server = smtp.return_value.__enter__.return_value
+            server.has_extn.return_value = False
+            server.sendmail.return_value = refused or {}
+            sent = backend.send_messages(messages or self.messages)
+        return sent, smtp, server
+
+    def test_sequential_and_concurrent_delivery_count_the_same(self):
+        sent, smtp, server = self.send(max_workers=1)
+        self.assertEqual(sent, 9)
+        self.assertEqual(smtp.call_count, 3)
+
+        sent, smtp, server = self.send(max_workers=4, max_per_domain=2)
+        self.assertEqual(sent, 9)
+        self.assertEqual(smtp.call_count, 6)
+
+    def test_one_transaction_per_message_and_domain(self):
+        message = EmailMessage(
+            'Assunto', 'Corpo', 'nao-responda@sigos.com.br',
+            ['a@um.com', 'b@um.com', 'c@um.com', 'd@dois.com']
+        )
+        with mock.patch.object(message, 'message', wraps=message.message) as render:
+            sent, smtp, server = self.send([message])
+
+        self.assertEqual(sent, 4)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(server.sendmail.call_count, 2)
+        recipients = sorted(call.args[1] for call in server.sendmail.call_args_list)
+        self.assertEqual(recipients, [['a@um.com', 'b@um.com', 'c@um.com'], ['d@dois.com']])
+
+    def test_refused_recipients_are_not_counted(self):
+        message = EmailMessage('Assunto', 'Corpo', 'nao-responda@sigos.com.br', ['a@um.com', 'b@um.com'])
+
+        sent, smtp, server = self.send([message], refused={'b@um.com': (550, b'No such user')}, fail_silently=True)
+        self.assertEqual(sent, 1)
+
+    def test_connection_error_is_silenced_when_asked(self):
+        message = EmailMessage('Assunto', 'Corpo', 'nao-responda@sigos.com.br', ['a@um.com'])
+        with mock.patch.object(DirectMXEmailBackend, '_resolve_mx', return_value='mx.local'), \
+                mock.patch('core.email_backends.smtplib.SMTP', side_effect=ConnectionRefusedError), \
+                mock.patch('builtins.print'):
+            self.assertEqual(DirectMXEmailBackend(fail_silently=True).send_messages([message]), 0)
+            with self.assertRaises(ConnectionRefusedError):
+                DirectMXEmailBackend().send_messages([message])
+
+
+class CPFBatchValidatorTests(SimpleTestCase):
+
+    def test_batch_matches_scalar_rules(self):
+        values = ['401.853.320-99', '27538947604', '111.111.111-11', '123', '401.853.320-98', None]
+        expected_errors = [None, None, CPF_REPEATED_DIGITS, CPF_INVALID_LENGTH, CPF_INVALID_CHECK_DIGITS, CPF_INVALID_LENGTH]
+
+        for use_numpy in (True, False):
+            valid, errors = validate_cpf_batch(values, use_numpy=use_numpy)
+            self.assertEqual(valid, [True, True, False, False, False, False])
+            self.assertEqual(errors, expected_errors)
+
+
+class StartupProfileTests(SimpleTestCase):
+
+    def test_cold_start_skips_heavy_optional_imports(self):
+        out = io.StringIO()
+        call_command('profile_startup', paths=['/api/v1/hello/'], runs=1, top=5000, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['statuses'], {'/api/v1/hello/': '200 OK'})
+        self.assertIn('first /api/v1/hello/', report['phases_ms'])
+        # Só a validação em lote, o snapshot e o envio de e-mail usam estes pacotes.
+        roots = {module['module'].split('.')[0] for module in report['modules_ms']}
+        self.assertIn('django', roots)
+        self.assertFalse(roots & {'numpy', 'pyarrow', 'dns'})
+
+
+class SeedingTests(TestCase):
+
+    def test_seeded_orders_are_valid_and_reproducible(self):
+        user = User.objects.create_user(username='seed', password='123', email='seed@example.com')
+
+        created = bulk_create_orders(order_rows(50, [user.pk], seed=7), batch_size=20)
+        orders = list(OrdemServico.objects.all())
+
+        self.assertEqual(created, 50)
+        self.assertTrue(all(validate_cpf_batch([o.cpf for o in orders])[0]))
+        self.assertGreater(len({o.created_at for o in orders}), 1)
+        self.assertTrue(all(o.cpf_key == make_cpf_key(o.cpf) for o in orders))
+        self.assertEqual(
+            [row['cpf'] for row in order_rows(5, [], seed=7)],
+            [row['cpf'] for row in order_rows(5, [], seed=7)],
+        )
+
+    def test_seed_orders_command(self):
+        call_command('seed_orders', count=30, users=3, chunk_size=20, stdout=io.StringIO())
+        call_command('seed_orders', count=10, users=3, stdout=io.StringIO())
+
+        self.assertEqual(OrdemServico.objects.filter(protocol__startswith='SEED-').count(), 40)
+        self.assertEqual(User.objects.filter(username__startswith='seed-').count(), 3)
+        self.assertFalse(OrdemServico.objects.filter(created_by__isnull=True).exists())
+
+
+class PartitionOrdersCommandTests(SimpleTestCase):
+
+    def test_month_ranges(self):
+        ranges = list(month_ranges(
+            datetime(2025, 11, 15, tzinfo=dt_timezone.utc),
+            datetime(2026, 1, 2, tzinfo=dt_timezone.utc),
+        ))
+        self.assertEqual([partition_name(lower) for lower, upper in ranges], [
+            'core_serviceorder_p202511', 'core_serviceorder_p202512', 'core_serviceorder_p202601',
+        ])
+        self.assertEqual(ranges[-1][1].month, 2)
+
+    @skipUnless(connection.vendor != 'postgresql', 'testa a recusa em outros bancos')
+    def test_requires_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command('partition_orders', stdout=io.StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'particionamento só no PostgreSQL')
+class PartitionOrdersTests(TestCase):
+    # DDL é transacional no PostgreSQL: a conversão é desfeita ao fim de cada teste.
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='part', password='123', email='part@example.com')
+
+    def order(self, protocol, created_at, status='open'):
+        return OrdemServico.objects.create(
+            created_by=self.user,
+            protocol=protocol,
+            so_number=protocol,
+            recipient_name="Cliente",
+            description="Descrição",
+            priority="low",
+            status=status,
+            cpf="401.853.320-99",
+            created_at=created_at,
+        )
+
+    def partition_of(self, order):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM core_serviceorder WHERE id = %s', [order.pk])
+            return cursor.fetchone()[0]
+
+    def test_convert_keeps_protocol_unique_across_partitions(self):
+        old = self.order('PROT-P1', timezone.now() - timedelta(days=400))
+        call_command('partition_orders', '--convert', stdout=io.StringIO())
+
+        self.assertEqual(self.partition_of(old), f"core_serviceorder_p{old.created_at:%Y%m}")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.order('PROT-P1', timezone.now())
+
+        old.delete()
+        self.order('PROT-P1', timezone.now())
+
+    def test_create_ahead_moves_orders_out_of_default_partition(self):
+        call_command('partition_orders', '--convert', '--ahead', '0', stdout=io.StringIO())
+        future = self.order('PROT-P2', timezone.now() + timedelta(days=45))
+        self.assertEqual(self.partition_of(future), 'core_serviceorder_default')
+
+        out = io.StringIO()
+        call_command('partition_orders', '--ahead', '3', stdout=out)
+
+        self.assertIn('1 ordens movidas', out.getvalue())
+        self.assertEqual(self.partition_of(future), f"core_serviceorder_p{future.created_at:%Y%m}")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.order('PROT-P2', timezone.now())
+
+    def test_archive_copies_columns_added_after_archive_table(self):
+        done = self.order('PROT-P3', timezone.now() - timedelta(days=400))
+        call_command('partition_orders', '--convert', '--archive-after', '90', stdout=io.StringIO())
+        with connection.cursor() as cursor:
+            # Como uma migração posterior à criação do arquivo.
+            cursor.execute("ALTER TABLE core_serviceorder ADD COLUMN archive_note text DEFAULT 'nota'")
+        OrdemServico.objects.filter(pk=done.pk).update(status='completed')
+
+        call_command('partition_orders', '--archive-after', '90', stdout=io.StringIO())
+
+        self.assertFalse(OrdemServico.objects.filter(pk=done.pk).exists())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT protocol, archive_note FROM core_serviceorder_archive WHERE id = %s', [done.pk])
+            self.assertEqual(cursor.fetchone(), ('PROT-P3', 'nota'))
+        # O protocolo de uma ordem arquivada continua reservado.
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.order('PROT-P3', timezone.now())
+
+
+@skipUnless(snapshots.HAS_PYARROW, 'pyarrow não instalado')
+class AnalyticsSnapshotTests(APITestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.admin = User.objects.create_user(username='analyst', password='123', is_staff=True, email='analyst@example.com')
+        bulk_create_orders(order_rows(30, [self.admin.pk], seed=3))
+
+    def test_incremental_export(self):
+        total, files = snapshots.export_snapshot(self.directory, lag=timedelta(0))
+        self.assertEqual(total, 30)
+
+        table = snapshots.pq.read_table(os.path.join(self.directory, files[0]['path']))
+        self.assertEqual(table.schema.field('status').type, snapshots.pa.dictionary(snapshots.pa.int8(), snapshots.pa.string()))
+        self.assertNotIn('cpf', table.column_names)
+
+        order = OrdemServico.objects.first()
+        order.status = 'cancelled'
+        order.save()
+        total, files = snapshots.export_snapshot(self.directory, lag=timedelta(0))
+        self.assertEqual(total, 1)
+        self.assertEqual(snapshots.pq.read_table(os.path.join(self.directory, files[0]['path']))['id'][0].as_py(), str(order.pk))
+
+    def test_manifest_and_download_endpoints(self):
+        snapshots.export_snapshot(self.directory, lag=timedelta(0))
+        self.client.force_authenticate(user=self.admin)
+
+        with override_settings(ANALYTICS_SNAPSHOT_DIR=self.directory):
+            manifest = self.client.get(reverse('analytics-snapshot')).data
+            self.assertEqual(sum(info['rows'] for info in manifest['files']), 30)
+
+            path = manifest['files'][0]['path']
+            response = self.client.get(reverse('analytics-snapshot-file', kwargs={'path': path}))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'PAR1'))
+
+            response = self.client.get(reverse('analytics-snapshot-file', kwargs={'path': '../settings.py'}))
+            self.assertEqual(response.status_code, 404)
+
+
+class AsyncReadViewTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='async', password='123', email='async@example.com')
+        self.order = OrdemServico.objects.create(
+            created_by=self.user,
+            protocol="PROT-A1",
+            so_number="OS-A1",
+            recipient_name="Cliente Async",
+            description="Descrição async",
+            priority="high",
+            cpf="401.853.320-99"
+        )
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        self.factory = AsyncRequestFactory()
+
+    async def test_list_is_paginated_and_filtered(self):
+        view = async_views.OrdemServicoList.as_view()
+
+        request = self.factory.get('/api/v1/ordens-servico/', {'status': 'open', 'search': 'async'}, headers=self.headers)
+        response = await view(request)
+        data = json.loads(response.content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['protocol'], 'PROT-A1')
+        self.assertEqual(data['results'][0]['created_by'], 'async')
+        self.assertEqual(data['results'][0]['cpf_anonimo'], '401.***.***-99')
+
+    async def test_detail_and_profile(self):
+        response = await async_views.OrdemServicoDetail.as_view()(self.factory.get('/', headers=self.headers), pk=self.order.pk)
+        self.assertEqual(json.loads(response.content)['id'], str(self.order.pk))
+
+        response = await async_views.UserProfileView.as_view()(self.factory.get('/', headers=self.headers))
+        self.assertEqual(json.loads(response.content)['username'], 'async')
+
+    async def test_requires_authentication(self):
+        response = await async_views.OrdemServicoList.as_view()(self.factory.get('/'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_view_without_aget_is_not_allowed(self):
+        response = await async_views.AsyncReadView.as_view()(self.factory.get('/', headers=self.headers))
+        self.assertEqual(response.status_code, 405)
+
+
+class OrderEventTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='eventos', password='123', email='eventos@example.com')
+        self.other = User.objects.create_user(username='outro', password='123', email='outro@example.com')
+        self.order = OrdemServico.objects.create(
+            created_by=self.user,
+            protocol="PROT-E1",
+            so_number="OS-E1",
+            recipient_name="Cliente",
+            description="Descrição",
+            cpf="401.853.320-99"
+        )
+        self.foreign = OrdemServico.objects.create(
+            created_by=self.other,
+            protocol="PROT-E2",
+            so_number="OS-E2",
+            recipient_name="Outro",
+            description="Descrição",
+            cpf="275.389.476-04"
+        )
+
+    def test_saves_and_bulk_changes_record_events(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.patch(reverse('ordem-detail', kwargs={'pk': self.order.pk}), {'status': 'in_progress'}, format='json')
+        self.client.post(reverse('ordem-bulk'), {'action': 'update', 'ids': [str(self.order.pk)], 'priority': 'high'}, format='json')
+        self.client.post(reverse('ordem-bulk'), {'action': 'delete', 'ids': [str(self.order.pk)]}, format='json')
+
+        events = list(ServiceOrderEvent.objects.filter(order_id=self.order.pk))
+        self.assertEqual([event.action for event in events], ['created', 'updated', 'updated', 'deleted'])
+        self.assertEqual(events[1].payload['status'], 'in_progress')
+        self.assertEqual(events[2].payload['priority'], 'high')
+        self.assertEqual(events[3].created_by, self.user)
+
+    async def test_stream_resumes_from_last_event_id_and_filters_by_owner(self):
+        first = await ServiceOrderEvent.objects.order_by('id').afirst()
+        self.order.status = 'completed'
+        await self.order.asave()
+
+        request = AsyncRequestFactory().get(
+            '/api/v1/ordens-servico/eventos/',
+            {'access_token': str(AccessToken.for_user(self.user))},
+            headers={'Last-Event-ID': str(first.pk - 1)},
+        )
+        response = await async_views.OrdemServicoEventos.as_view()(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = response.streaming_content
+        try:
+            chunks = [await anext(stream) for _ in range(3)]
+        finally:
+            await stream.aclose()
+
+        self.assertTrue(chunks[0].startswith(b'retry:'))
+        created, updated = (chunk.decode().split('\n') for chunk in chunks[1:])
+        self.assertEqual(created[:2], [f'id: {first.pk}', 'event: created'])
+        self.assertEqual(updated[1], 'event: updated')
+        self.assertEqual(json.loads(updated[2][len('data: '):])['status'], 'completed')
+        # A ordem do outro usuário (PROT-E2) não aparece.
+        self.assertNotIn(b'PROT-E2', b''.join(chunks))
+
+    async def test_stream_requires_authentication(self):
+        response = await async_views.OrdemServicoEventos.as_view()(AsyncRequestFactory().get('/'))
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        patcher = mock.patch('core.db_routers.replica_is_healthy', return_value=True)
+        self.healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_replica_until_a_write(self):
+        token = pin_to_primary(False)
+        try:
+            self.assertEqual(self.router.db_for_read(OrdemServico), 'replica1')
+            self.assertEqual(self.router.db_for_write(OrdemServico), 'default')
+            self.assertEqual(self.router.db_for_read(OrdemServico), 'default')
+        finally:
+            unpin(token)
+
+    def test_falls_back_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+        self.healthy.return_value = False
+        self.assertEqual(self.router.db_for_read(OrdemServico), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
@@ -0,0 +1,201 @@
+"""
+Limites de uso dos endpoints caros: login, redefinição de senha, importação CSV
+e buscas com página grande.
+
+- TokenBucketThrottle: balde de fichas por usuário (ou IP, se anônimo) e por
+  escopo, guardado no cache `shared` (arquivos em disco, visto por todos os
+  workers da máquina, sem Redis). Sem fichas: 429 com `Retry-After`.
+- Vagas de concorrência: no máximo CONCURRENCY_LIMITS[escopo] requisições do
+  escopo em andamento na máquina. Sem vaga: 503 (load shedding), antes de a
+  fila de requisições lentas ocupar todos os workers.
+"""
+import os
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    A taxa `N/período` (DEFAULT_THROTTLE_RATES, formato do DRF) permite rajadas
+    de até N requisições e repõe N fichas por período. Usuários staff têm o
+    balde multiplicado por RATE_LIMIT_STAFF_MULTIPLIER; os de
+    RATE_LIMIT_EXEMPT_USERS não têm limite.
+
+    O balde é lido e gravado sem lock: sob concorrência o limite é aproximado.
+    """
+    cache_format = 'throttle:{scope}:{ident}'
+
+    def __init__(self):
+        # Lidos a cada requisição, e não na importação como no DRF, para respeitar override_settings.
+        self.cache = caches[settings.RATE_LIMIT_CACHE]
+        super().__init__()
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def applies(self, request, view):
+        return True
+
+    def get_cache_key(self, request, view):
+        user = request.user
+        if user and user.is_authenticated:
+            if user.get_username() in settings.RATE_LIMIT_EXEMPT_USERS:
+                return None
+            ident = user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format.format(scope=self.scope, ident=ident)
+
+    def allow_request(self, request, view):
+        if not settings.RATE_LIMITING or self.rate is None or not self.applies(request, view):
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity = self.num_requests
+        if request.user and request.user.is_staff:
+            capacity *= settings.RATE_LIMIT_STAFF_MULTIPLIER
+        refill = capacity / self.duration
+
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            self.retry_after = (1 - tokens) / refill
+            return False
+
+        # Depois de `duration` sem uso o balde estaria cheio de novo: a chave pode expirar.
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+
+class PasswordResetThrottle(TokenBucketThrottle):
+    scope = 'password_reset'
+
+
+class ImportThrottle(TokenBucketThrottle):
+    scope = 'import'
+
+
+def is_expensive_search(request):
+    """Busca textual ou página maior que o PAGE_SIZE padrão."""
+    if request.method != 'GET':
+        return False
+    if request.query_params.get('search'):
+        return True
+    try:
+        return int(request.query_params.get('page_size', 0)) > api_settings.PAGE_SIZE
+    except ValueError:
+        return False
+
+
+class SearchThrottle(TokenBucketThrottle):
+    scope = 'search'
+
+    def applies(self, request, view):
+        return is_expensive_search(request)
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Servidor sobrecarregado. Tente novamente em instantes.'
+    default_code = 'service_overloaded'
+
+    def __init__(self, wait=1):
+        super().__init__()
+        # O exception handler do DRF transforma em `Retry-After`.
+        self.wait = wait
+
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+
+def _acquire_file_slot(scope, limit):
+    # Uma vaga é um arquivo com flock exclusivo: os workers disputam as mesmas
+    # vagas e o sistema libera o lock se o processo morrer no meio da requisição.
+    directory = settings.CONCURRENCY_LOCK_DIR
+    os.makedirs(directory, exist_ok=True)
+    start = random.randrange(limit)
+    for index in range(limit):
+        path = os.path.join(directory, f'{scope}-{(start + index) % limit}.lock')
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        return fd
+    return None
+
+
+def _acquire_process_slot(scope, limit):
+    # Sem fcntl (Windows): o limite vale por processo.
+    with _semaphores_lock:
+        semaphore = _semaphores.setdefault(scope, threading.BoundedSemaphore(limit))
+    return semaphore if semaphore.acquire(blocking=False) else None
+
+
+def acquire_slot(scope):
+    """
+    Reserva uma vaga do escopo e a retorna (passe para release_slot), ou None
+    se o escopo não tem limite. Levanta ServiceOverloaded se não houver vaga.
+    """
+    limit = settings.CONCURRENCY_LIMITS.get(scope) if scope else None
+    if not settings.RATE_LIMITING or not limit:
+        return None
+
+    slot = (_acquire_file_slot if fcntl is not None else _acquire_process_slot)(scope, limit)
+    if slot is None:
+        raise ServiceOverloaded()
+    return slot
+
+
+def release_slot(slot):
+    if slot is None:
+        return
+    if isinstance(slot, int):
+        os.close(slot)
+    else:
+        slot.release()
+
+
+class LoadSheddingMixin:
+    """
+    Segura uma vaga de `concurrency_scope` enquanto a view DRF processa a
+    requisição (depois de autenticação, permissões e throttles).
+    """
+    concurrency_scope = None
+
+    def get_concurrency_scope(self, request):
+        return self.concurrency_scope
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.concurrency_slot = acquire_slot(self.get_concurrency_scope(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        release_slot(getattr(self, 'concurrency_slot', None))
+        self.concurrency_slot = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,18 +1,36 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
+
 urlpatterns = [
     path('auth/register/', views.register_user, name='register'),
     path('users/', views.UserList.as_view(), name='user-list'),
     path('users/<uuid:pk>/', views.UserDetail.as_view(), name='user-detail'),
-    path('ordens-servico/', views.OrdemServicoList.as_view(), name='ordem-list'),
-    path('ordens-servico/<uuid:pk>/', views.OrdemServicoDetail.as_view(), name='ordem-detail'),
+    path('ordens-servico/', read_views.OrdemServicoList.as_view(), name='ordem-list'),
+    path('ordens-servico/<uuid:pk>/', read_views.OrdemServicoDetail.as_view(), name='ordem-detail'),
     path('ordens-servico/importar-csv/', views.OrdemServicoImportCSV.as_view(), name='ordem-import-csv'),
-    path('auth/user/', views.UserProfileView.as_view(), name='auth-user-profile'),
+    path('ordens-servico/bulk/', views.OrdemServicoBulk.as_view(), name='ordem-bulk'),
+    path('ordens-servico/alertas-sla/', views.SlaAlertList.as_view(), name='sla-alert-list'),
+    path('auth/user/', read_views.UserProfileView.as_view(), name='auth-user-profile'),
     path('auth/password-reset/', views.password_reset_request, name='password-reset-request'),
     path('auth/password-reset/confirm/', views.password_reset_confirm, name='password-reset-confirm'),
     path('auth/change-password/', views.ChangePasswordView.as_view(), name='auth-change-password'),
     path('demo/users/', views.presentation_user_list, name='presentation-list'),
     path('demo/users/delete/<uuid:pk>/', views.presentation_user_delete, name='presentation-delete'),
-    path('hello/', views.hello_world, name='hello-world'),
+    path('db/pool/', views.database_pool_stats, name='db-pool-stats'),
+    path('analytics/snapshot/', views.analytics_snapshot, name='analytics-snapshot'),
+    path('analytics/snapshot/<path:path>', views.analytics_snapshot_file, name='analytics-snapshot-file'),
+    path('hello/', read_views.hello_world, name='hello-world'),
 ]
+
+if settings.ASYNC_VIEWS:
+    # O stream fica aberto indefinidamente: só faz sentido no deploy ASGI, em que
+    # não ocupa um worker síncrono.
+    urlpatterns.append(
+        path('ordens-servico/eventos/', read_views.OrdemServicoEventos.as_view(), name='ordem-eventos')
+    )
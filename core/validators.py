@@ -1,35 +1,160 @@
+import hashlib
+import hmac
+import random
 import re
+from importlib.util import find_spec
+from django.conf import settings
 from rest_framework.serializers import ValidationError
 
-def validate_cpf(value):
-    cpf = re.sub(r'[^0-9]', '', str(value))
+# NumPy custa ~80 ms na partida da aplicação e só é usado na validação em lote:
+# importado no primeiro uso.
+HAS_NUMPY = find_spec('numpy') is not None
+np = None
 
-    if len(cpf) != 11:
-        raise ValidationError("O CPF deve conter 11 dígitos.")
+CPF_INVALID_LENGTH = 'invalid_length'
+CPF_REPEATED_DIGITS = 'repeated_digits'
+CPF_INVALID_CHECK_DIGITS = 'invalid_check_digits'
 
-    if cpf == cpf[0] * len(cpf):
-        raise ValidationError("CPF inválido.")
+CPF_ERROR_MESSAGES = {
+    CPF_INVALID_LENGTH: "O CPF deve conter 11 dígitos.",
+    CPF_REPEATED_DIGITS: "CPF inválido.",
+    CPF_INVALID_CHECK_DIGITS: "CPF inválido (dígitos verificadores não conferem).",
+}
 
-    cnt = 0
-    for i in range(10, 1, -1):
-        cnt += int(cpf[10 - i]) * i
+_NON_DIGITS = re.compile(r'[^0-9]')
 
-    result = (cnt * 10) % 11
-    if result == 10 or result == 11:
-        result = 0
+# Quantidade de CPFs processados por vez no caminho NumPy, para limitar a memória.
+CPF_BATCH_CHUNK_SIZE = 100_000
 
-    if result != int(cpf[9]):
-        raise ValidationError("CPF inválido (dígitos verificadores não conferem).")
 
+def _check_digit(digits):
     cnt = 0
-    for i in range(11, 1, -1):
-        cnt += int(cpf[11 - i]) * i
+    for i, digit in enumerate(digits):
+        cnt += int(digit) * (len(digits) + 1 - i)
 
     result = (cnt * 10) % 11
     if result == 10 or result == 11:
         result = 0
+    return result
+
+
+def _cpf_error(cpf):
+    if len(cpf) != 11:
+        return CPF_INVALID_LENGTH
+
+    if cpf == cpf[0] * len(cpf):
+        return CPF_REPEATED_DIGITS
+
+    if _check_digit(cpf[:9]) != int(cpf[9]) or _check_digit(cpf[:10]) != int(cpf[10]):
+        return CPF_INVALID_CHECK_DIGITS
+
+    return None
+
+
+def normalize_cpf(value):
+    if value is None:
+        return None
+
+    cpf = _NON_DIGITS.sub('', str(value))
+    return cpf if len(cpf) == 11 else None
+
+
+def make_cpf_key(value):
+    """
+    Chave de tamanho fixo para buscar ordens pelo CPF sem guardar o número
+    em claro: HMAC-SHA256 dos 11 dígitos normalizados.
+    """
+    cpf = normalize_cpf(value)
+    if cpf is None:
+        return None
+
+    return hmac.new(settings.CPF_HASH_KEY.encode(), cpf.encode(), hashlib.sha256).hexdigest()
+
+
+def validate_cpf(value):
+    cpf = _NON_DIGITS.sub('', str(value))
 
-    if result != int(cpf[10]):
-        raise ValidationError("CPF inválido (dígitos verificadores não conferem).")
+    error = _cpf_error(cpf)
+    if error:
+        raise ValidationError(CPF_ERROR_MESSAGES[error])
 
     return value
+
+
+def _validate_cpf_batch_python(values):
+    errors = [_cpf_error(_NON_DIGITS.sub('', str(value))) for value in values]
+    return [error is None for error in errors], errors
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+def _validate_cpf_chunk_numpy(values):
+    codes = np.array([str(value) for value in values], dtype=str)
+    width = max(codes.dtype.itemsize // 4, 11)
+    chars = np.zeros((len(values), width), dtype=np.uint32)
+    chars[:, :codes.dtype.itemsize // 4] = codes.view(np.uint32).reshape(len(values), -1)
+
+    is_digit = (chars >= ord('0')) & (chars <= ord('9'))
+    lengths = is_digit.sum(axis=1)
+
+    # Move os dígitos para o início de cada linha mantendo a ordem original.
+    order = np.argsort(~is_digit, axis=1, kind='stable')
+    digits = np.take_along_axis(chars, order[:, :11], axis=1).astype(np.int64) - ord('0')
+
+    invalid_length = lengths != 11
+    repeated = (digits == digits[:, :1]).all(axis=1)
+
+    first = (digits[:, :9] @ np.arange(10, 1, -1) * 10) % 11
+    first[first == 10] = 0
+    second = (digits[:, :10] @ np.arange(11, 1, -1) * 10) % 11
+    second[second == 10] = 0
+    invalid_check_digits = (first != digits[:, 9]) | (second != digits[:, 10])
+
+    errors = np.full(len(values), None, dtype=object)
+    errors[invalid_check_digits] = CPF_INVALID_CHECK_DIGITS
+    errors[repeated] = CPF_REPEATED_DIGITS
+    errors[invalid_length] = CPF_INVALID_LENGTH
+
+    valid = ~(invalid_length | repeated | invalid_check_digits)
+    return valid.tolist(), errors.tolist()
+
+
+def validate_cpf_batch(values, use_numpy=True):
+    """
+    Valida uma sequência de CPFs de uma vez.
+
+    Retorna ``(valid, errors)``: uma lista de booleanos e uma lista com o
+    código de erro de cada item (``None`` quando o CPF é válido). Usa NumPy
+    quando disponível e cai para Python puro caso contrário.
+    """
+    values = list(values)
+    if not HAS_NUMPY or not use_numpy or not values:
+        return _validate_cpf_batch_python(values)
+
+    _load_numpy()
+
+    valid, errors = [], []
+    for start in range(0, len(values), CPF_BATCH_CHUNK_SIZE):
+        chunk_valid, chunk_errors = _validate_cpf_chunk_numpy(values[start:start + CPF_BATCH_CHUNK_SIZE])
+        valid.extend(chunk_valid)
+        errors.extend(chunk_errors)
+    return valid, errors
+
+
+def generate_cpf(rng=random, formatted=True):
+    digits = ''.join(str(rng.randint(0, 9)) for _ in range(9))
+    digits += str(_check_digit(digits))
+    digits += str(_check_digit(digits))
+
+    if digits == digits[0] * 11:
+        return generate_cpf(rng, formatted)
+
+    if formatted:
+        return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+    return digits
@@ -1,26 +1,50 @@
 import csv
 import io
+import os
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import connection, transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, permissions, status
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
 
-from .models import ServiceOrder
+from .events import EVENT_FIELDS, batched_events, record_events
+from .filters import PrefixSearchFilter, ServiceOrderFilter, ServiceOrderOrderingFilter
+from .idempotency import content_key, idempotent
+from .metrics import render_prometheus
+from .models import PRIORITY_RANK, ServiceOrder, ServiceOrderEventAction, SlaAlert, SlaAlertLevel, sla_due_at
+from .pagination import KeysetPagination, encode_keyset_cursor, keyset_filter
+from .parsers import parser_classes_with_msgpack
+from .renderers import renderer_classes_with_msgpack
+from .snapshots import read_manifest
+from .throttling import (
+    ImportThrottle,
+    LoadSheddingMixin,
+    LoginThrottle,
+    PasswordResetThrottle,
+    SearchThrottle,
+    is_expensive_search,
+)
+from .validators import make_cpf_key
+from .warmup import ensure_warm
 from .serializers import (
     UserProfileSerializer,
     UserSerializer,
     UserRegistrationSerializer,
     ServiceOrderSerializer,
+    ServiceOrderBulkSerializer,
+    ServiceOrderImportSerializer,
+    SlaAlertSerializer,
     PasswordResetConfirmSerializer
 )
 
+from django.utils import timezone
 from django.utils.http import urlsafe_base64_encode
 from django.core.mail import send_mail
 from django.contrib.auth.tokens import default_token_generator
@@ -29,7 +53,13 @@ from django.conf import settings
 
 from .serializers import ChangePasswordSerializer
 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.db.models import F, Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.views.decorators.http import require_GET
 
 User = get_user_model()
 
@@ -55,6 +85,9 @@ class UserListView(generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    filter_backends = [PrefixSearchFilter]
+    prefix_search_fields = ['username', 'email']
 
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -161,6 +194,9 @@ def register_user(request):
 class UserList(generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [PrefixSearchFilter]
+    prefix_search_fields = ['username', 'email']
 
 
 class UserDetail(generics.RetrieveAPIView):
@@ -175,64 +211,193 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
-class OrdemServicoList(generics.ListCreateAPIView):
+# Endpoints de ordens de serviço também falam MessagePack com os clientes internos.
+SERVICE_ORDER_RENDERERS = renderer_classes_with_msgpack()
+SERVICE_ORDER_PARSERS = parser_classes_with_msgpack()
 
-    queryset = ServiceOrder.objects.all()
+class OrdemServicoList(LoadSheddingMixin, generics.ListCreateAPIView):
+
+    queryset = ServiceOrder.objects.select_related('created_by')
     serializer_class = ServiceOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = SERVICE_ORDER_RENDERERS
+    parser_classes = SERVICE_ORDER_PARSERS
+    # Só buscas textuais e páginas grandes contam no limite.
+    throttle_classes = [SearchThrottle]
 
     filter_backends = [
         DjangoFilterBackend,
         SearchFilter,
-        OrderingFilter
+        ServiceOrderOrderingFilter
     ]
 
-    filterset_fields = ['status', 'priority', 'type', 'provider']
+    # Filtros por created_at também permitem ao PostgreSQL descartar partições
+    # fora do intervalo (ver comando partition_orders).
+    filterset_class = ServiceOrderFilter
 
     search_fields = ['protocol', 'so_number', 'description', 'recipient_name']
 
     ordering_fields = ['created_at', 'priority']
 
+    def get_concurrency_scope(self, request):
+        return 'search' if is_expensive_search(request) else None
+
+    @idempotent('ordem-create')
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 class OrdemServicoDetail(generics.RetrieveUpdateDestroyAPIView):
-    queryset = ServiceOrder.objects.all()
+    queryset = ServiceOrder.objects.select_related('created_by')
     serializer_class = ServiceOrderSerializer
+    renderer_classes = SERVICE_ORDER_RENDERERS
+    parser_classes = SERVICE_ORDER_PARSERS
+
+class OrdemServicoBulk(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = SERVICE_ORDER_RENDERERS
+    parser_classes = SERVICE_ORDER_PARSERS
+
+    def post(self, request, *args, **kwargs):
+        serializer = ServiceOrderBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        ids = list(dict.fromkeys(data['ids']))
+
+        queryset = ServiceOrder.objects.filter(pk__in=ids)
+        if not request.user.is_staff:
+            queryset = queryset.filter(created_by=request.user)
+
+        with transaction.atomic():
+            found = set(queryset.select_for_update().values_list('pk', flat=True))
+            targets = ServiceOrder.objects.filter(pk__in=found)
+
+            if data['action'] == ServiceOrderBulkSerializer.DELETE:
+                # O delete dispara post_delete por ordem; os eventos vão num único INSERT.
+                with batched_events():
+                    targets.delete()
+                result = 'deleted'
+            else:
+                changes = {
+                    field: data[field]
+                    for field in ServiceOrderBulkSerializer.UPDATE_FIELDS
+                    if field in data
+                }
+                if 'priority' in changes:
+                    priority = changes['priority']
+                    changes['priority_rank'] = PRIORITY_RANK[priority]
+                    # Só as ordens que mudam de prioridade têm o prazo recalculado e a
+                    # faixa reiniciada; as demais repetiriam os alertas já emitidos.
+                    targets.exclude(priority=priority).update(
+                        due_at=sla_due_at(F('created_at'), priority),
+                        sla_alert_level=SlaAlertLevel.NONE,
+                    )
+                targets.update(updated_at=timezone.now(), **changes)
+                # update() não dispara post_save.
+                record_events(ServiceOrderEventAction.UPDATED, targets.values(*EVENT_FIELDS))
+                result = 'updated'
+
+        return Response(
+            {
+                'action': data['action'],
+                'processed': len(found),
+                'results': [
+                    {'id': pk, 'result': result if pk in found else 'not_found'}
+                    for pk in ids
+                ],
+            },
+            status=status.HTTP_200_OK
+        )
+
+class SlaAlertList(generics.ListAPIView):
+    """
+    Alertas gerados pelo comando scan_sla, mais recentes primeiro. `?after=<id>`
+    traz só os alertas novos desde o último visto.
+    """
+    serializer_class = SlaAlertSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = SERVICE_ORDER_RENDERERS
+
+    def get_queryset(self):
+        alerts = SlaAlert.objects.select_related('order')
+        if not self.request.user.is_staff:
+            alerts = alerts.filter(order__created_by=self.request.user)
 
+        after = self.request.query_params.get('after')
+        if after:
+            if not after.isdigit():
+                raise ValidationError({'after': 'Deve ser o id numérico de um alerta.'})
+            alerts = alerts.filter(id__gt=after)
+        return alerts
 
 class _OrdemServicoImportCSV(APIView):
     def post(self, request, *args, **kwargs):
         return Response({"message": "CSV Import endpoint is working"}, status=status.HTTP_200_OK)
 
-class OrdemServicoImportCSV(APIView):
+def customer_counts(cpf_keys, existing_keys):
+    """
+    Linhas de clientes que já têm ordens e CPFs repetidos no arquivo. Linhas sem
+    chave (CPF vazio ou inválido) não são de cliente nenhum e não contam.
+    """
+    keys = [key for key in cpf_keys if key]
+    return {
+        "existing_customers": sum(1 for key in keys if key in existing_keys),
+        "duplicate_customers_in_file": len(keys) - len(set(keys)),
+    }
+
+class OrdemServicoImportCSV(LoadSheddingMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = SERVICE_ORDER_RENDERERS
+    parser_classes = SERVICE_ORDER_PARSERS
+    throttle_classes = [ImportThrottle]
+    concurrency_scope = 'import'
 
+    # Sem Idempotency-Key, o hash do conteúdo recusa o reenvio do mesmo arquivo antes de lê-lo.
+    @idempotent('ordem-import', duplicate_key=content_key)
     def post(self, request, *args, **kwargs):
-        csv_file = request.FILES.get('file')
-        if not csv_file:
-            return Response({"error": "Nenhum arquivo enviado."}, status=status.HTTP_400_BAD_REQUEST)
+        if isinstance(request.data, list):
+            # Clientes internos enviam as linhas já estruturadas (MessagePack ou JSON) em vez do arquivo.
+            csv_data = request.data
+        else:
+            csv_file = request.FILES.get('file')
+            if not csv_file:
+                return Response({"error": "Nenhum arquivo enviado."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not csv_file.name.endswith('.csv'):
-            return Response({"error": "O arquive deve ser um CSV."}, status=status.HTTP_400_BAD_REQUEST)
+            if not csv_file.name.endswith('.csv'):
+                return Response({"error": "O arquive deve ser um CSV."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            decoded_file = csv_file.read().decode('utf-8-sig')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            csv_data = list(reader)
-        except Exception as e:
-            return Response({"error": f"Não foi possível processar o arquivo CSV: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                decoded_file = csv_file.read().decode('utf-8-sig')
+                io_string = io.StringIO(decoded_file)
+                reader = csv.DictReader(io_string)
+                csv_data = list(reader)
+            except Exception as e:
+                return Response({"error": f"Não foi possível processar o arquivo CSV: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
         if not csv_data:
             return Response({"error": "CSV está vázio."}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = ServiceOrderSerializer(data=csv_data, many=True, context={'request': request})
+        serializer = ServiceOrderImportSerializer(data=csv_data, many=True, context={'request': request})
 
         if serializer.is_valid():
-            serializer.save()
+            cpf_keys = [make_cpf_key(row.get('cpf')) for row in serializer.validated_data]
+            existing_keys = set(
+                ServiceOrder.objects.filter(cpf_key__in={key for key in cpf_keys if key})
+                .values_list('cpf_key', flat=True)
+                .distinct()
+            )
+
+            with transaction.atomic(), batched_events():
+                serializer.save()
             return Response(
-                {"message": f"Importado com sucesso {len(serializer.data)} ordens de serviço."},
+                {
+                    "message": f"Importado com sucesso {len(serializer.data)} ordens de serviço.",
+                    **customer_counts(cpf_keys, existing_keys),
+                },
                 status=status.HTTP_201_CREATED
             )
         else:
@@ -240,6 +405,7 @@ class OrdemServicoImportCSV(APIView):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([PasswordResetThrottle])
 def password_reset_request(request):
     email = request.data.get('email')
     if not email:
@@ -286,6 +452,7 @@ def password_reset_request(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([PasswordResetThrottle])
 def password_reset_confirm(request):
     serializer = PasswordResetConfirmSerializer(data=request.data)
 
@@ -298,6 +465,11 @@ def password_reset_confirm(request):
     else:
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LoginView(LoadSheddingMixin, TokenObtainPairView):
+    # O hash da senha é o trecho mais caro em CPU da API.
+    throttle_classes = [LoginThrottle]
+    concurrency_scope = 'login'
+
 class ChangePasswordView(generics.UpdateAPIView):
     serializer_class = ChangePasswordSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -315,9 +487,65 @@ class ChangePasswordView(generics.UpdateAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+PRESENTATION_PAGE_SIZE = 100
+PRESENTATION_MAX_PAGE_SIZE = 1000
+PRESENTATION_CHUNK_SIZE = 50
+
 def presentation_user_list(request):
-    users = User.objects.all().order_by("-date_joined")
-    return render(request, "presentation_users.html", {"users": users})
+    search = request.GET.get('search', '').strip()
+    try:
+        page_size = int(request.GET.get('page_size', PRESENTATION_PAGE_SIZE))
+    except ValueError:
+        page_size = PRESENTATION_PAGE_SIZE
+    page_size = max(1, min(page_size, PRESENTATION_MAX_PAGE_SIZE))
+
+    users = User.objects.only('id', 'username', 'email', 'is_superuser', 'date_joined')
+    if search:
+        users = users.filter(Q(username__startswith=search) | Q(email__startswith=search))
+
+    try:
+        users = keyset_filter(users, request.GET.get('cursor'))
+    except ValueError:
+        return redirect("presentation-list")
+
+    # O cookie de CSRF precisa ser definido antes de a resposta começar a ser enviada.
+    get_token(request)
+
+    return StreamingHttpResponse(
+        _stream_presentation_users(request, users[:page_size + 1], page_size, search),
+        content_type='text/html; charset=utf-8'
+    )
+
+def _stream_presentation_users(request, users, page_size, search):
+    yield render_to_string("presentation_users.html", {'search': search, 'page_size': page_size}, request)
+
+    rendered, chunk, last, has_next = 0, [], None, False
+    for user in users.iterator(chunk_size=PRESENTATION_CHUNK_SIZE):
+        if rendered + len(chunk) == page_size:
+            has_next = True
+            break
+
+        chunk.append(user)
+        if len(chunk) == PRESENTATION_CHUNK_SIZE:
+            yield render_to_string("presentation_users_rows.html", {'users': chunk}, request)
+            rendered, last, chunk = rendered + len(chunk), chunk[-1], []
+
+    if chunk:
+        yield render_to_string("presentation_users_rows.html", {'users': chunk}, request)
+        rendered, last = rendered + len(chunk), chunk[-1]
+
+    next_query = None
+    if has_next:
+        params = {'cursor': encode_keyset_cursor((last.date_joined, last.pk)), 'page_size': page_size}
+        if search:
+            params['search'] = search
+        next_query = urlencode(params)
+
+    yield render_to_string(
+        "presentation_users_footer.html",
+        {'empty': rendered == 0, 'next_query': next_query, 'search': search},
+        request
+    )
 
 def presentation_user_delete(request, pk):
     if request.method == "POST":
@@ -326,7 +554,66 @@ def presentation_user_delete(request, pk):
 
     return redirect("presentation-list")
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def database_pool_stats(request):
+    settings_dict = connection.settings_dict
+    pool = getattr(connection, 'pool', None)
+
+    return Response({
+        'vendor': connection.vendor,
+        'conn_max_age': settings_dict['CONN_MAX_AGE'],
+        'conn_health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+        'connected': connection.connection is not None,
+        'pool': pool.get_stats() if pool is not None else None,
+    })
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def hello_world(request):
     return Response({"message": "hello"})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def analytics_snapshot(request):
+    return Response(read_manifest(settings.ANALYTICS_SNAPSHOT_DIR))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def analytics_snapshot_file(request, path):
+    directory = settings.ANALYTICS_SNAPSHOT_DIR
+    # Só serve arquivos listados no manifesto.
+    if path not in {info['path'] for info in read_manifest(directory)['files']}:
+        raise Http404
+
+    return FileResponse(
+        open(os.path.join(directory, path), 'rb'),
+        as_attachment=True,
+        filename=path.replace('/', '_'),
+        content_type='application/vnd.apache.parquet'
+    )
+
+@require_GET
+def readiness(request):
+    """
+    Health check do balanceador: 200 só com o worker aquecido (core.warmup).
+    Sem o hook do gunicorn, a primeira chamada faz o aquecimento.
+    """
+    warm = ensure_warm()
+    response = JsonResponse(
+        {'status': 'ready' if warm['warm'] else 'warming_up', **warm},
+        status=200 if warm['warm'] else 503,
+    )
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@require_GET
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+
+    return HttpResponse(
+        render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,144 @@
+"""
+Aquecimento de um worker antes de ele receber tráfego.
+
+Sem isso, as primeiras requisições depois de um deploy pagam a conexão com o
+banco, a montagem dos serializers, a configuração do JWT e a compilação das
+rotas. O gunicorn chama warm_up() em cada worker (gunicorn.conf.py) antes de
+ele aceitar conexões; GET /ready responde 503 até o worker estar aquecido, e o
+balanceador só manda tráfego depois disso.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import get_resolver
+from django.utils import translation
+from django.utils.translation import gettext
+
+from .db_routers import replica_is_healthy
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {'warm': False, 'duration_ms': None, 'steps': {}, 'errors': {}}
+
+
+def _database():
+    # Só o primário decide a prontidão: sem réplica saudável, o ReplicaRouter lê do primário.
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def replica_status():
+    """Réplicas de DATABASE_REPLICAS que respondem. Informativo: não afeta a prontidão."""
+    return {alias: replica_is_healthy(alias) for alias in settings.DATABASE_REPLICAS}
+
+
+def _jwt():
+    # Configura o backend do simplejwt (algoritmo e chaves) e valida um token.
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    AccessToken(str(AccessToken()))
+
+
+def _serializers():
+    from .serializers import (
+        ServiceOrderImportSerializer,
+        ServiceOrderSerializer,
+        SlaAlertSerializer,
+        UserProfileSerializer,
+    )
+
+    for serializer_class in (ServiceOrderSerializer, ServiceOrderImportSerializer, SlaAlertSerializer, UserProfileSerializer):
+        serializer_class().fields
+
+
+def _api_settings():
+    # O DRF importa as classes configuradas no primeiro acesso a cada setting.
+    from rest_framework.settings import api_settings
+
+    for name in (
+        'DEFAULT_RENDERER_CLASSES',
+        'DEFAULT_PARSER_CLASSES',
+        'DEFAULT_AUTHENTICATION_CLASSES',
+        'DEFAULT_PERMISSION_CLASSES',
+        'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+        'DEFAULT_PAGINATION_CLASS',
+        'DEFAULT_FILTER_BACKENDS',
+        'EXCEPTION_HANDLER',
+    ):
+        getattr(api_settings, name)
+
+
+def preload_urls():
+    """Importa as views e compila as expressões das rotas de WARMUP_PATHS."""
+    resolver = get_resolver()
+    for path in settings.WARMUP_PATHS:
+        resolver.resolve(path)
+    # Tabela usada pelo reverse() (links de paginação, admin).
+    resolver.reverse_dict
+
+
+def _caches():
+    for alias in settings.CACHES:
+        caches[alias].get('warmup')
+    # Carrega os catálogos de tradução usados nas mensagens de erro.
+    with translation.override(settings.LANGUAGE_CODE):
+        gettext('This field is required.')
+
+
+STEPS = [
+    ('urls', preload_urls),
+    ('api_settings', _api_settings),
+    ('serializers', _serializers),
+    ('jwt', _jwt),
+    ('database', _database),
+    ('caches', _caches),
+]
+
+
+def warm_up():
+    """
+    Executa cada etapa e registra o tempo (ms) ou o erro. O worker fica
+    aquecido se todas derem certo; uma etapa com erro não impede as demais.
+    """
+    with _lock:
+        started = time.perf_counter()
+        steps, errors = {}, {}
+        for name, step in STEPS:
+            mark = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:
+                logger.exception('Aquecimento: etapa %s falhou.', name)
+                errors[name] = type(exc).__name__
+            else:
+                steps[name] = round((time.perf_counter() - mark) * 1000, 1)
+
+        _state.update(
+            warm=not errors,
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            steps=steps,
+            errors=errors,
+        )
+        return warm_status()
+
+
+def warm_status():
+    return {
+        'warm': _state['warm'],
+        'duration_ms': _state['duration_ms'],
+        'steps': dict(_state['steps']),
+        'errors': dict(_state['errors']),
+        'replicas': replica_status(),
+    }
+
+
+def ensure_warm():
+    """Aquece na primeira chamada (deploys sem o hook do gunicorn) ou se a anterior falhou."""
+    if not _state['warm']:
+        warm_up()
+    return warm_status()
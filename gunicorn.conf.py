@@ -0,0 +1,18 @@
+"""
+Configuração do gunicorn, lida automaticamente por
+`gunicorn config.wsgi:application` na raiz do projeto.
+"""
+
+
+def post_worker_init(worker):
+    # Roda em cada worker com a aplicação já carregada e antes de ele aceitar
+    # conexões: o primeiro cliente não paga o aquecimento (ver core/warmup.py).
+    # Em post_fork a aplicação ainda não foi carregada no worker.
+    from core.warmup import warm_up
+
+    status = warm_up()
+    if status['warm']:
+        worker.log.info('Worker %s aquecido em %s ms: %s', worker.pid, status['duration_ms'], status['steps'])
+    else:
+        # O worker atende mesmo assim; GET /ready segue 503 até uma nova tentativa dar certo.
+        worker.log.warning('Worker %s não aqueceu: %s', worker.pid, status['errors'])